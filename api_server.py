@@ -1,20 +1,46 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 from typing import List, Dict, Any
 from datetime import datetime
 
 # Import utility modules
-from utils.language_agent import generate_with_groq, construct_prompt, format_market_data
-from utils.retriever_agent import search_documents, SearchResults
+from utils.language_agent import (
+    generate_with_groq,
+    construct_prompt,
+    format_market_data,
+    close_groq_client,
+    stream_with_groq,
+    format_sse,
+    is_fallback_response,
+    StreamInterrupted
+)
+from utils.retriever_agent import search_documents_async, embed_query_async, SearchResults, retriever, query_encoder
+from utils.response_cache import response_cache, context_hash
+from utils.hybrid_search import RERANK_ENABLED
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the cross-encoder now rather than inside the first query's latency budget
+    if RERANK_ENABLED:
+        await asyncio.to_thread(retriever.reranker.warm_up)
+    yield
+    response_cache.save()
+    retriever.save_if_dirty()
+    query_encoder.close()
+    # Release pooled LLM connections on shutdown
+    await close_groq_client()
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -35,30 +61,49 @@ class ChatResponse(BaseModel):
     confidence: float
     sources: List[str]
 
+async def prepare_chat(request: ChatRequest):
+    """Build the prompt and collect sources for a chat request"""
+    # Search for relevant documents; the query is encoded together with concurrent requests
+    query_vector = await embed_query_async(request.query)
+    search_results = await search_documents_async(request.query, query_vector=query_vector)
+    
+    # Construct context from search results
+    context = " ".join([result.text for result in search_results.results]) if search_results.results else ""
+    
+    # Format market data
+    market_summary = format_market_data(request.market_data)
+    
+    # Construct prompt
+    prompt = construct_prompt(request.query, context, market_summary)
+    
+    # Calculate confidence
+    confidence = 0.8 if search_results.results else 0.5
+    
+    # Get sources
+    sources = [result.metadata.get("source", "Unknown") for result in search_results.results]
+    
+    # Answers can be reused only for the same market snapshot and context
+    cache_key = context_hash(market_summary, context)
+    
+    return prompt, confidence, sources, cache_key, query_vector
+
 # FastAPI Routes
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     try:
-        # Search for relevant documents
-        search_results = search_documents(request.query)
-        
-        # Construct context from search results
-        context = " ".join([result.text for result in search_results.results]) if search_results.results else ""
+        prompt, confidence, sources, cache_key, query_vector = await prepare_chat(request)
         
-        # Format market data
-        market_summary = format_market_data(request.market_data)
-        
-        # Construct prompt
-        prompt = construct_prompt(request.query, context, market_summary)
+        # Serve near-duplicate questions from the response cache
+        query_vector = response_cache.normalize(query_vector)
+        cached = response_cache.lookup(query_vector, cache_key)
+        if cached:
+            entry, _ = cached
+            return ChatResponse(response=entry.response, confidence=entry.confidence, sources=entry.sources)
         
         # Generate response
         response = await generate_with_groq(prompt)
-        
-        # Calculate confidence
-        confidence = 0.8 if search_results.results else 0.5
-        
-        # Get sources
-        sources = [result.metadata.get("source", "Unknown") for result in search_results.results]
+        if not is_fallback_response(response):
+            response_cache.store(query_vector, request.query, cache_key, response, confidence, sources)
         
         return ChatResponse(
             response=response,
@@ -69,6 +114,43 @@ async def chat_endpoint(request: ChatRequest):
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    try:
+        prompt, confidence, sources, cache_key, query_vector = await prepare_chat(request)
+        query_vector = response_cache.normalize(query_vector)
+        cached = response_cache.lookup(query_vector, cache_key)
+    except Exception as e:
+        logger.error(f"Error in chat stream endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        if cached:
+            entry, _ = cached
+            yield format_sse("token", {"token": entry.response})
+            yield format_sse("done", {"confidence": entry.confidence, "sources": entry.sources, "cached": True})
+            return
+
+        # Forward tokens as they arrive, then send sources and confidence last
+        response = ""
+        try:
+            async for token in stream_with_groq(prompt):
+                response += token
+                yield format_sse("token", {"token": token})
+        except StreamInterrupted as e:
+            # The client has a truncated answer: flag it and keep it out of the cache
+            yield format_sse("error", {"error": str(e), "partial": True})
+            return
+        if not is_fallback_response(response):
+            response_cache.store(query_vector, request.query, cache_key, response, confidence, sources)
+        yield format_sse("done", {"confidence": confidence, "sources": sources})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/market-overview")
 async def market_overview():
     try:
@@ -0,0 +1,122 @@
+"""
+Recall vs latency sweep for the vector index types in utils.vector_index.
+
+Exact IndexFlatL2 results are the ground truth. Each index type is built and
+trained the same way RetrieverAgent builds it, then searched across a range
+of nprobe (IVF) or efSearch (HNSW) values. Each row reports recall@k,
+per-query latency (single-query searches, as the chat path issues them) and
+batched throughput, which is what an operating point is picked from.
+
+Vectors come from an .npy file of real embeddings when --vectors is given,
+otherwise from a clustered synthetic set that behaves more like sentence
+embeddings than uniform noise does.
+
+    python -m benchmarks.ann_recall --size 200000 --queries 500
+    python -m benchmarks.ann_recall --vectors embeddings.npy --types ivf_flat hnsw
+"""
+import argparse
+import time
+from dataclasses import replace
+
+import faiss
+import numpy as np
+
+from utils.vector_index import IndexConfig, INDEX_TYPES, build_index, search_params
+
+NPROBE_SWEEP = [1, 2, 4, 8, 16, 32, 64, 128]
+EF_SEARCH_SWEEP = [16, 32, 64, 128, 256, 512]
+
+def synthetic_vectors(size: int, dimension: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Unit-normalized points scattered around random cluster centres"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimension)).astype('float32')
+    labels = rng.integers(0, clusters, size)
+    vectors = centres[labels] + rng.standard_normal((size, dimension)).astype('float32')
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(row[row >= 0]) & set(expected)) for row, expected in zip(found, truth))
+    return hits / truth.size
+
+def measure(index: faiss.Index, queries: np.ndarray, k: int, params) -> dict:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query[None, :], k, params=params)
+        latencies.append(time.perf_counter() - started)
+    latencies = np.array(latencies) * 1000
+
+    started = time.perf_counter()
+    _, found = index.search(queries, k, params=params)
+    batch_elapsed = time.perf_counter() - started
+
+    return {
+        "found": found,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "qps": len(queries) / batch_elapsed
+    }
+
+def sweep(index: faiss.Index):
+    if isinstance(index, faiss.IndexIVF):
+        return [("nprobe", value, search_params(index, nprobe=value)) for value in NPROBE_SWEEP if value <= index.nlist]
+    if isinstance(index, faiss.IndexHNSW):
+        return [("efSearch", value, search_params(index, ef_search=value)) for value in EF_SEARCH_SWEEP]
+    return [("-", "-", None)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", help=".npy file of corpus embeddings")
+    parser.add_argument("--size", type=int, default=100000, help="synthetic corpus size")
+    parser.add_argument("--dimension", type=int, default=384, help="synthetic embedding dimension")
+    parser.add_argument("--clusters", type=int, default=1000, help="synthetic cluster count")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--threads", type=int, default=0, help="faiss OpenMP threads (0 keeps the default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+
+    # Index settings come from the same environment variables the retriever reads
+    config = IndexConfig.from_env()
+
+    if args.vectors:
+        vectors = np.ascontiguousarray(np.load(args.vectors), dtype='float32')
+    else:
+        vectors = synthetic_vectors(args.size + args.queries, args.dimension, args.clusters)
+    # Hold queries out of the corpus so nothing finds itself at distance zero
+    rng = np.random.default_rng(1)
+    order = rng.permutation(len(vectors))
+    queries, corpus = vectors[order[:args.queries]], vectors[order[args.queries:]]
+    dimension = corpus.shape[1]
+
+    exact = faiss.IndexFlatL2(dimension)
+    exact.add(corpus)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"corpus: {len(corpus)} x {dimension}, queries: {len(queries)}, k: {args.k}")
+    print(f"{'index':<10} {'param':<9} {'value':>6} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'qps':>9} {'build s':>8} {'MB':>8}")
+    for index_type in args.types:
+        index_config = replace(config, index_type=index_type)
+        started = time.perf_counter()
+        try:
+            index = build_index(corpus, dimension, index_config)
+        except Exception as e:
+            print(f"{index_type:<10} failed to build: {str(e)}")
+            continue
+        build_seconds = time.perf_counter() - started
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+
+        for param, value, params in sweep(index):
+            result = measure(index, queries, args.k, params)
+            recall = recall_at_k(result["found"], truth)
+            print(
+                f"{index_type:<10} {param:<9} {value:>6} {recall:>7.3f} {result['p50_ms']:>8.3f} "
+                f"{result['p99_ms']:>8.3f} {result['qps']:>9.0f} {build_seconds:>8.1f} {size_mb:>8.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
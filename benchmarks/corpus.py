@@ -0,0 +1,28 @@
+"""
+Text corpora shared by the benchmarks.
+
+Texts come from a JSONL file ({"text"} per line) or a JSON list of
+documents, which is the format of the retriever's document store and the
+bundled fallback documents.
+"""
+import json
+import os
+from typing import List
+
+def load_texts(path: str, limit: int) -> List[str]:
+    texts = []
+    with open(path, "r") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    texts.append(json.loads(line)["text"])
+                if len(texts) >= limit:
+                    break
+        else:
+            texts = [doc["text"] for doc in json.load(f)][:limit]
+    return texts
+
+def default_corpus() -> str:
+    # Same locations the retriever reads, without importing it and building its index
+    documents_path = os.path.join(os.getenv("VECTOR_STORE_DIR", "vector_store"), "documents.json")
+    return documents_path if os.path.exists(documents_path) else os.getenv("FALLBACK_DOCS_PATH", "data/fallback_docs.json")
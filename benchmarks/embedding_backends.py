@@ -0,0 +1,107 @@
+"""
+Latency, throughput and retrieval quality of the embedding backends.
+
+Each backend in utils.embedding_backend loads the same model. The run
+measures single-query encode latency (the chat path), batched corpus
+throughput (the ingest path) and how closely each backend reproduces the
+torch embeddings. Quality is reported as the mean cosine to the torch
+vector of the same text, and recall@k of the torch top-k neighbours when
+the corpus is searched with the backend's own vectors.
+
+The corpus defaults to the retriever's document store, or the bundled
+fallback documents. Pass --corpus for a JSONL file ({"text"} per line).
+Queries are the first sentence of each document unless --queries is given.
+
+    python -m benchmarks.embedding_backends
+    python -m benchmarks.embedding_backends --corpus news.jsonl --backends torch onnx_int8 --threads 2
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.corpus import default_corpus, load_texts
+from utils.embedding_backend import EMBEDDING_BACKENDS, EMBEDDING_THREADS, load_embedding_model
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def top_k(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(queries @ corpus.T), axis=1, kind="stable")[:, :k]
+
+def bench(model, corpus, queries, batch_size: int, repeats: int):
+    model.encode(queries[:8])  # warm up
+
+    latencies = []
+    for _ in range(repeats):
+        for query in queries:
+            started = time.perf_counter()
+            model.encode([query])
+            latencies.append(time.perf_counter() - started)
+    latencies = np.array(latencies) * 1000
+
+    started = time.perf_counter()
+    corpus_vectors = model.encode(corpus, batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "texts_per_second": len(corpus) / elapsed,
+        "corpus": normalize(corpus_vectors),
+        "queries": normalize(model.encode(queries, batch_size=batch_size))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    parser.add_argument("--corpus", help="JSONL or documents.json style file")
+    parser.add_argument("--queries", help="text file with one query per line")
+    parser.add_argument("--limit", type=int, default=5000, help="max corpus documents")
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--threads", type=int, default=EMBEDDING_THREADS)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=3, help="passes over the queries for latency")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_texts(args.corpus or default_corpus(), args.limit)
+    if args.queries:
+        with open(args.queries, "r") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = [text.split(". ")[0] for text in corpus[:200]]
+    k = min(args.k, len(corpus))
+
+    # torch is the reference the other backends are compared with
+    backends = ["torch"] + [backend for backend in args.backends if backend != "torch"]
+    reference = None
+    print(f"corpus: {len(corpus)} texts, queries: {len(queries)}, threads: {args.threads}")
+    print(f"{'backend':<10} {'p50 ms':>8} {'p99 ms':>8} {'texts/s':>9} {'cosine':>7} {'recall@' + str(k):>9}")
+    for backend in backends:
+        model, loaded = load_embedding_model(args.model, backend, args.threads)
+        if loaded != backend:
+            print(f"{backend:<10} unavailable, see the log above")
+            continue
+        result = bench(model, corpus, queries, args.batch_size, args.repeats)
+
+        if reference is None:
+            reference = result
+            reference["neighbours"] = top_k(result["queries"], result["corpus"], k)
+            cosine, recall = 1.0, 1.0
+        else:
+            cosine = float(np.mean(np.sum(result["corpus"] * reference["corpus"], axis=1)))
+            neighbours = top_k(result["queries"], result["corpus"], k)
+            hits = sum(len(set(found) & set(expected)) for found, expected in zip(neighbours, reference["neighbours"]))
+            recall = hits / reference["neighbours"].size
+
+        if backend in args.backends:
+            print(
+                f"{backend:<10} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+                f"{result['texts_per_second']:>9.0f} {cosine:>7.4f} {recall:>9.3f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Concurrency check for generate_with_groq against a local mock Groq server.
+
+The mock serves the OpenAI-compatible chat completions route with a fixed
+latency, so the run shows whether completions overlap and whether the event
+loop stays responsive while they are in flight. With --stream the same run
+goes through stream_with_groq and also reports time to first token.
+
+    python -m benchmarks.llm_concurrency --requests 32 --latency 0.5
+    python -m benchmarks.llm_concurrency --requests 32 --latency 0.5 --stream
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+MOCK_HOST = "127.0.0.1"
+
+def create_mock_app(latency: float, reply: str) -> FastAPI:
+    """OpenAI-compatible chat completions endpoint with artificial latency"""
+    mock = FastAPI()
+
+    @mock.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if body.get("stream"):
+            return StreamingResponse(stream_chunks(body.get("model", "mock")), media_type="text/event-stream")
+        await asyncio.sleep(latency)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    async def stream_chunks(model: str):
+        # Spread the latency over the tokens like a real generation would
+        tokens = [token + " " for token in reply.split()]
+        for token in tokens:
+            await asyncio.sleep(latency / len(tokens))
+            chunk = {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return mock
+
+def start_mock_server(app: FastAPI, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host=MOCK_HOST, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Largest delay seen by a periodic task, i.e. how long the loop was blocked"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+async def stream_one(prompt: str, started: float):
+    from utils.language_agent import stream_with_groq
+
+    first_token = None
+    response = ""
+    async for token in stream_with_groq(prompt):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        response += token
+    return response.strip(), first_token
+
+async def run(requests: int, stream: bool):
+    from utils.language_agent import generate_with_groq, close_groq_client
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+
+    started = time.perf_counter()
+    if stream:
+        results = await asyncio.gather(*(stream_one(f"question {i}", started) for i in range(requests)))
+        responses = [response for response, _ in results]
+        first_tokens = sorted(first for _, first in results if first is not None)
+    else:
+        responses = await asyncio.gather(*(generate_with_groq(f"question {i}") for i in range(requests)))
+        first_tokens = []
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    worst_lag = await lag_task
+    await close_groq_client()
+    return responses, elapsed, worst_lag, first_tokens
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stream", action="store_true", help="use stream_with_groq and report time to first token")
+    args = parser.parse_args()
+
+    reply = "mock answer with a handful of streamed tokens"
+    start_mock_server(create_mock_app(args.latency, reply), args.port)
+
+    # Must be set before utils.language_agent reads its configuration
+    os.environ["GROQ_BASE_URL"] = f"http://{MOCK_HOST}:{args.port}"
+    os.environ.setdefault("GROQ_API_KEY", "mock-key")
+
+    responses, elapsed, worst_lag, first_tokens = asyncio.run(run(args.requests, args.stream))
+    ok = sum(1 for response in responses if response == reply)
+    print(f"requests:         {args.requests} ({ok} ok)")
+    print(f"mock latency:     {args.latency:.3f}s, serial would take {args.requests * args.latency:.2f}s")
+    print(f"wall time:        {elapsed:.2f}s")
+    print(f"throughput:       {args.requests / elapsed:.1f} req/s")
+    print(f"worst loop lag:   {worst_lag * 1000:.1f}ms")
+    if first_tokens:
+        print(f"first token p50:  {first_tokens[len(first_tokens) // 2] * 1000:.0f}ms")
+        print(f"first token max:  {first_tokens[-1] * 1000:.0f}ms")
+
+if __name__ == "__main__":
+    main()
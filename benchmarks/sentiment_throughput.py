@@ -0,0 +1,72 @@
+"""
+Sentiment scoring throughput on CPU against the news scrape rate.
+
+Scores the same headlines with the lexicon and the classifier from
+utils.sentiment, with the score cache disabled so every text is really
+scored. Reports texts per second, per-batch latency and how many texts
+a scrape cycle can produce, so the slowest backend can be checked
+against --scrape-rate (articles per minute the feed brings in).
+
+Texts default to the retriever's document store, or the bundled
+fallback documents. Pass --corpus for a JSONL file ({"text"} per line).
+
+    python -m benchmarks.sentiment_throughput
+    python -m benchmarks.sentiment_throughput --corpus news.jsonl --batch-sizes 8 32 64 --scrape-rate 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.corpus import default_corpus, load_texts
+from utils.sentiment import SENTIMENT_MODEL, SentimentScorer
+
+def bench(scorer: SentimentScorer, texts, repeats: int):
+    scorer.score_many(texts[:scorer.batch_size])  # warm up, loading the model if needed
+    batch_ms = []
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for start in range(0, len(texts), scorer.batch_size):
+            batch_started = time.perf_counter()
+            scorer.score_many(texts[start:start + scorer.batch_size])
+            batch_ms.append((time.perf_counter() - batch_started) * 1000)
+    elapsed = time.perf_counter() - started
+    return {
+        "texts_per_second": len(texts) * repeats / elapsed,
+        "p50_batch_ms": float(np.percentile(batch_ms, 50)),
+        "p99_batch_ms": float(np.percentile(batch_ms, 99))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=SENTIMENT_MODEL)
+    parser.add_argument("--corpus", help="JSONL or documents.json style file")
+    parser.add_argument("--limit", type=int, default=1000, help="max texts")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[8, 32, 64])
+    parser.add_argument("--max-length", type=int, default=128, help="token limit per text")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--scrape-rate", type=float, default=100, help="articles per minute to keep up with")
+    args = parser.parse_args()
+
+    # Headline-length inputs, as the scorer sees in production
+    texts = [" ".join(text.split()[:60]) for text in load_texts(args.corpus or default_corpus(), args.limit)]
+    needed = args.scrape_rate / 60
+    print(f"texts: {len(texts)}, scrape rate: {args.scrape_rate:.0f}/min ({needed:.1f}/s)")
+    print(f"{'backend':<10} {'batch':>6} {'texts/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'headroom':>9}")
+    runs = [("lexicon", args.batch_sizes[0])] + [("model", batch_size) for batch_size in args.batch_sizes]
+    for backend, batch_size in runs:
+        scorer = SentimentScorer(
+            backend=backend, model_name=args.model, batch_size=batch_size,
+            max_length=args.max_length, cache_path=None
+        )
+        if backend == "model" and scorer._get_model() is None:
+            print(f"{backend:<10} unavailable, see the log above")
+            break
+        result = bench(scorer, texts, args.repeats)
+        print(
+            f"{backend:<10} {batch_size:>6} {result['texts_per_second']:>9.0f} {result['p50_batch_ms']:>8.2f} "
+            f"{result['p99_batch_ms']:>8.2f} {result['texts_per_second'] / needed:>8.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
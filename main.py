@@ -15,7 +15,6 @@ import time
 # Import utility modules
 from utils.language_agent import generate_with_groq, construct_prompt, format_market_data
 from utils.retriever_agent import search_documents, SearchResults
-from utils.scraping_agent import fetch_news_articles
 from utils.voice_agent import text_to_speech, speech_to_text
 
 # Configure logging
@@ -40,6 +39,19 @@ if 'market_data' not in st.session_state:
         }
     }
 
+def iter_sse_events(response):
+    """Yield (event, data) pairs from a streaming Server-Sent Events response"""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[len("data:"):].strip())
+        elif data_lines:
+            yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+
 # Streamlit UI
 def main():
     # Set page config
@@ -120,7 +132,14 @@ def main():
         
         # Display recent news
         st.subheader("Recent News")
-        news_articles = fetch_news_articles()
+        # Served by the API process, whose background feed indexes the news
+        try:
+            response = requests.get("http://localhost:8000/news", params={"max_articles": 5}, timeout=10)
+            response.raise_for_status()
+            news_articles = response.json()["data"]
+        except Exception as e:
+            logger.error(f"Error fetching news articles: {str(e)}")
+            news_articles = []
         for article in news_articles:
             with st.expander(article["title"]):
                 st.write(f"Source: {article['source']}")
@@ -154,16 +173,32 @@ def main():
     if query:
         # Add user message to chat
         st.session_state.chat_history.append({"role": "user", "content": query})
+        with st.chat_message("user"):
+            st.write(query)
         
-        # Get response from API
+        # Stream response from API, rendering tokens as they arrive
         try:
             response = requests.post(
-                "http://localhost:8000/api/chat",
-                json={"query": query, "market_data": market_data}
+                "http://localhost:8000/api/chat/stream",
+                json={"query": query, "market_data": market_data},
+                stream=True
             )
             
             if response.status_code == 200:
-                result = response.json()
+                result = {"response": "", "confidence": 0.0, "sources": []}
+                with st.chat_message("assistant"):
+                    placeholder = st.empty()
+                    for event, data in iter_sse_events(response):
+                        if event == "token":
+                            result["response"] += data["token"]
+                            placeholder.write(result["response"] + "▌")
+                        elif event == "done":
+                            result.update(data)
+                        elif event == "error":
+                            result["error"] = data["error"]
+                    placeholder.write(result["response"])
+                    if result.get("error"):
+                        st.warning("The response was interrupted and may be incomplete. Please try again.")
                 
                 # Generate audio for response
                 try:
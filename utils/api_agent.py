@@ -1,11 +1,24 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Any
-import requests
+from typing import Dict, Any, List, Optional
+import httpx
+import pandas as pd
+import yfinance as yf
+import asyncio
+import threading
 import os
 from dotenv import load_dotenv
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from utils.quote_cache import quote_cache
+from utils.streaming_analytics import streaming_analytics
+from utils.rate_limiter import (
+    RateLimiter,
+    RateLimitExceeded,
+    DailyQuotaExceeded,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BACKGROUND
+)
 
 # Load environment variables
 load_dotenv()
@@ -14,44 +27,349 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# httpx logs full request URLs at INFO, which would leak the API key
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Alpha Vantage client configuration
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+MAX_CONCURRENCY = int(os.getenv("ALPHA_VANTAGE_MAX_CONCURRENCY", "4"))
+REQUEST_TIMEOUT = float(os.getenv("ALPHA_VANTAGE_TIMEOUT", "10"))
+CALLS_PER_MINUTE = float(os.getenv("ALPHA_VANTAGE_CALLS_PER_MINUTE", "5"))
+CALLS_PER_DAY = float(os.getenv("ALPHA_VANTAGE_CALLS_PER_DAY", "500"))
+RATE_LIMIT_BACKOFF = float(os.getenv("ALPHA_VANTAGE_BACKOFF_SECONDS", "60"))
+MAX_RETRIES = int(os.getenv("ALPHA_VANTAGE_MAX_RETRIES", "1"))
+
+# Bulk quote configuration; REALTIME_BULK_QUOTES needs a premium Alpha Vantage key.
+# The chunk size applies to Alpha Vantage only; yfinance takes the whole list in one call.
+BULK_QUOTE_PROVIDER = os.getenv("BULK_QUOTE_PROVIDER", "yfinance")
+BULK_QUOTE_CHUNK_SIZE = int(os.getenv("BULK_QUOTE_CHUNK_SIZE", "100"))
+# Per-symbol GLOBAL_QUOTE calls a batch may spend on symbols the bulk call missed;
+# at 5 calls/min anything more would hold the request for minutes
+BATCH_FALLBACK_MAX_SYMBOLS = int(os.getenv("BATCH_FALLBACK_MAX_SYMBOLS", "3"))
+
+# Shared connection pool and concurrency cap for upstream calls
+_client: Optional[httpx.AsyncClient] = None
+_semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+# Shared quota scheduler that every Alpha Vantage call queues behind
+alpha_vantage_limiter = RateLimiter(CALLS_PER_MINUTE, CALLS_PER_DAY, name="alpha_vantage")
+
+# yfinance.download keeps its results in the module-global shared._DFS, resets it on every
+# call and busy-waits until it fills, so two downloads at once clobber each other
+_yfinance_lock = threading.Lock()
+
+def yfinance_download(symbols: List[str], **kwargs) -> pd.DataFrame:
+    """Blocking yf.download, one call at a time per process; it threads across tickers itself"""
+    with _yfinance_lock:
+        return yf.download(symbols, **kwargs)
+
+# Counters for the batched quote path
+batch_stats = {"requests": 0, "symbols": 0, "cache_hits": 0, "bulk_calls": 0, "bulk_hits": 0, "fallbacks": 0}
+
 class MarketData(BaseModel):
     metrics: Dict[str, Any]
     stocks: Dict[str, Any]
     timestamp: str
 
-async def fetch_market_data(symbols: list) -> Dict[str, Any]:
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared pooled HTTP client, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(REQUEST_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_CONCURRENCY,
+                max_keepalive_connections=MAX_CONCURRENCY
+            )
+        )
+    return _client
+
+async def close_http_client():
+    """Close the shared HTTP client and release its connections"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+def _get_api_key() -> str:
+    api_key = os.getenv("ALPHA_VANTAGE_API_KEY")
+    if not api_key:
+        raise ValueError("ALPHA_VANTAGE_API_KEY not found in environment variables")
+    return api_key
+
+def parse_quote(quote: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an Alpha Vantage GLOBAL_QUOTE payload into our stock shape"""
+    return {
+        "price": float(quote.get("05. price", 0)),
+        "change": float(quote.get("09. change", 0)),
+        "change_percent": float(quote.get("10. change percent", "0").replace("%", "")),
+        "volume": int(quote.get("06. volume", 0)),
+        "trading_day": quote.get("07. latest trading day")
+    }
+
+def is_rate_limit_payload(payload: Dict[str, Any]) -> bool:
+    """Detect the HTTP 200 "Note"/"Information" payload Alpha Vantage sends when throttling"""
+    message = str(payload.get("Note") or payload.get("Information") or "").lower()
+    return any(marker in message for marker in ("call frequency", "rate limit", "requests per"))
+
+def is_daily_limit_payload(payload: Dict[str, Any]) -> bool:
+    """Detect the daily-quota message, which no per-minute backoff will clear"""
+    message = str(payload.get("Note") or payload.get("Information") or "").lower()
+    # The per-minute note also quotes the daily figure ("5 calls per minute and 500 calls per day")
+    return ("per day" in message or "daily" in message) and "per minute" not in message
+
+def seconds_until_daily_reset() -> float:
+    # Alpha Vantage counts the daily quota per UTC day
+    now = datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+async def alpha_vantage_get(params: Dict[str, Any], priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+    """Call Alpha Vantage behind the shared rate limiter, backing off on rate-limit notes"""
+    for attempt in range(MAX_RETRIES + 1):
+        await alpha_vantage_limiter.acquire(priority)
+        async with _semaphore:
+            response = await get_http_client().get(ALPHA_VANTAGE_URL, params=params)
+        response.raise_for_status()
+
+        payload = response.json()
+        if is_daily_limit_payload(payload):
+            # Fail fast to stale quotes instead of backing off for hours
+            alpha_vantage_limiter.exhaust_daily(seconds_until_daily_reset())
+            raise DailyQuotaExceeded(f"Alpha Vantage daily quota exhausted for {params.get('function')}")
+        if not is_rate_limit_payload(payload):
+            return payload
+
+        alpha_vantage_limiter.backoff(RATE_LIMIT_BACKOFF * (2 ** attempt))
+
+    raise RateLimitExceeded(f"Alpha Vantage rate limit exceeded for {params.get('function')}")
+
+async def fetch_quote(
+    symbol: str,
+    api_key: str,
+    priority: int = PRIORITY_INTERACTIVE
+) -> Optional[Dict[str, Any]]:
+    """Fetch a single GLOBAL_QUOTE, bounded by the shared rate limiter and concurrency cap"""
+    params = {"function": "GLOBAL_QUOTE", "symbol": symbol, "apikey": api_key}
+    payload = await alpha_vantage_get(params, priority)
+
+    quote = payload.get("Global Quote", {})
+    if not quote:
+        return None
+
+    parsed = parse_quote(quote)
+    streaming_analytics.update(symbol, parsed["price"], parsed["trading_day"])
+    return parsed
+
+def _parse_bulk_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "price": float(row.get("close") or 0),
+        "change": float(row.get("change") or 0),
+        "change_percent": float(str(row.get("change_percent") or "0").replace("%", "")),
+        "volume": int(float(row.get("volume") or 0)),
+        "trading_day": str(row.get("timestamp") or "")[:10] or None
+    }
+
+async def fetch_bulk_quotes_alpha_vantage(
+    symbols: List[str],
+    api_key: str,
+    priority: int = PRIORITY_INTERACTIVE
+) -> Dict[str, Dict[str, Any]]:
+    """Fetch up to 100 symbols in one REALTIME_BULK_QUOTES call"""
+    params = {"function": "REALTIME_BULK_QUOTES", "symbol": ",".join(symbols), "apikey": api_key}
+    payload = await alpha_vantage_get(params, priority)
+
+    quotes = {}
+    for row in payload.get("data", []):
+        symbol = row.get("symbol")
+        if symbol in symbols:
+            quotes[symbol] = _parse_bulk_row(row)
+    return quotes
+
+def _parse_yfinance_frame(frame: pd.DataFrame, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Turn a yfinance.download frame of daily bars into quotes"""
+    quotes = {}
+    for symbol in symbols:
+        if isinstance(frame.columns, pd.MultiIndex):
+            if symbol not in frame.columns.get_level_values(0):
+                continue
+            bars = frame[symbol]
+        elif len(symbols) == 1:
+            bars = frame
+        else:
+            continue
+
+        bars = bars.dropna(subset=["Close"])
+        if bars.empty:
+            continue
+        close = float(bars["Close"].iloc[-1])
+        previous = float(bars["Close"].iloc[-2]) if len(bars) > 1 else close
+        volume = bars["Volume"].iloc[-1]
+        change = close - previous
+        quotes[symbol] = {
+            "price": close,
+            "change": change,
+            "change_percent": change / previous * 100 if previous else 0.0,
+            "volume": int(volume) if pd.notna(volume) else 0,
+            "trading_day": pd.Timestamp(bars.index[-1]).date().isoformat()
+        }
+    return quotes
+
+async def fetch_bulk_quotes_yfinance(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch many symbols with a single yfinance.download call"""
+    frame = await asyncio.to_thread(
+        yfinance_download,
+        symbols,
+        period="5d",
+        interval="1d",
+        group_by="ticker",
+        threads=True,
+        progress=False
+    )
+    if frame is None or frame.empty:
+        return {}
+    return _parse_yfinance_frame(frame, symbols)
+
+async def fetch_bulk_quotes(
+    symbols: List[str],
+    api_key: str,
+    priority: int = PRIORITY_INTERACTIVE
+) -> Dict[str, Dict[str, Any]]:
+    """Fetch quotes from the configured bulk provider: 100-symbol chunks for Alpha Vantage, one yfinance call"""
+    if BULK_QUOTE_PROVIDER == "alpha_vantage":
+        chunks = [symbols[i:i + BULK_QUOTE_CHUNK_SIZE] for i in range(0, len(symbols), BULK_QUOTE_CHUNK_SIZE)]
+        calls = [fetch_bulk_quotes_alpha_vantage(chunk, api_key, priority) for chunk in chunks]
+    else:
+        chunks = [symbols]
+        calls = [fetch_bulk_quotes_yfinance(symbols)]
+
+    quotes = {}
+    for chunk, result in zip(chunks, await asyncio.gather(*calls, return_exceptions=True)):
+        batch_stats["bulk_calls"] += 1
+        if isinstance(result, BaseException):
+            logger.warning(f"Bulk quote call failed for {len(chunk)} symbols: {str(result)}")
+            continue
+        quotes.update(result)
+    return quotes
+
+def calculate_portfolio_metrics(stocks: Dict[str, Any]) -> Dict[str, Any]:
+    """Aggregate portfolio metrics over the fetched stocks"""
+    if not stocks:
+        return {}
+    return {
+        "total_value": sum(stock["price"] for stock in stocks.values()),
+        "avg_change": sum(stock["change_percent"] for stock in stocks.values()) / len(stocks),
+        "total_volume": sum(stock["volume"] for stock in stocks.values())
+    }
+
+async def fetch_market_data(
+    symbols: list,
+    use_cache: bool = True,
+    force_refresh: bool = False,
+    priority: int = PRIORITY_INTERACTIVE
+) -> Dict[str, Any]:
     """Fetch market data from Alpha Vantage API"""
     try:
-        api_key = os.getenv("ALPHA_VANTAGE_API_KEY")
-        if not api_key:
-            raise ValueError("ALPHA_VANTAGE_API_KEY not found in environment variables")
+        api_key = _get_api_key()
 
         data = {"metrics": {}, "stocks": {}, "timestamp": datetime.now().isoformat()}
-        
-        for symbol in symbols:
-            url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={api_key}"
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            quote = response.json().get("Global Quote", {})
+
+        async def load(symbol: str) -> Optional[Dict[str, Any]]:
+            return await fetch_quote(symbol, api_key, priority)
+
+        # Per-symbol requests run concurrently over the shared pool; cached
+        # symbols skip the upstream call and concurrent misses are coalesced
+        if use_cache:
+            loads = (quote_cache.get_or_load(symbol, load, force_refresh, priority) for symbol in symbols)
+        else:
+            loads = (load(symbol) for symbol in symbols)
+        quotes = await asyncio.gather(*loads, return_exceptions=True)
+
+        for symbol, quote in zip(symbols, quotes):
+            if isinstance(quote, RateLimitExceeded):
+                # Serve the last known quote rather than dropping the symbol
+                entry = quote_cache.get_entry(symbol)
+                if entry is None:
+                    raise quote
+                quote = entry.value
+            elif isinstance(quote, BaseException):
+                raise quote
             if quote:
-                data["stocks"][symbol] = {
-                    "price": float(quote.get("05. price", 0)),
-                    "change": float(quote.get("09. change", 0)),
-                    "change_percent": float(quote.get("10. change percent", "0").replace("%", "")),
-                    "volume": int(quote.get("06. volume", 0))
-                }
-        
+                data["stocks"][symbol] = quote
+
         # Calculate portfolio metrics
-        if data["stocks"]:
-            data["metrics"] = {
-                "total_value": sum(stock["price"] for stock in data["stocks"].values()),
-                "avg_change": sum(stock["change_percent"] for stock in data["stocks"].values()) / len(data["stocks"]),
-                "total_volume": sum(stock["volume"] for stock in data["stocks"].values())
-            }
-        
+        data["metrics"] = calculate_portfolio_metrics(data["stocks"])
+
         return data
-        
+
     except Exception as e:
         logger.error(f"Error fetching market data: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def fetch_quotes_batch(
+    symbols: List[str],
+    priority: int = PRIORITY_INTERACTIVE
+) -> Dict[str, Any]:
+    """Fetch quotes for an arbitrary symbol list using bulk calls, falling back per symbol"""
+    try:
+        api_key = _get_api_key()
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+
+        data = {"metrics": {}, "stocks": {}, "missing": [], "timestamp": datetime.now().isoformat()}
+        batch_stats["requests"] += 1
+        batch_stats["symbols"] += len(symbols)
+
+        # Serve what we can from the quote cache
+        misses = []
+        for symbol in symbols:
+            quote = quote_cache.get(symbol)
+            if quote is not None:
+                data["stocks"][symbol] = quote
+            else:
+                misses.append(symbol)
+        batch_stats["cache_hits"] += len(symbols) - len(misses)
+
+        # One bulk round-trip per chunk for the rest
+        if misses:
+            bulk_quotes = await fetch_bulk_quotes(misses, api_key, priority)
+            batch_stats["bulk_hits"] += len(bulk_quotes)
+            for symbol, quote in bulk_quotes.items():
+                quote_cache.set(symbol, quote)
+                # The bar date is the tick, so a re-served unchanged bar is not folded in twice
+                streaming_analytics.update(symbol, quote["price"], quote.get("trading_day"))
+                data["stocks"][symbol] = quote
+
+        # Individual calls only for a few symbols the bulk provider did not return;
+        # the rest are reported missing rather than draining the daily quota
+        leftovers = [symbol for symbol in misses if symbol not in data["stocks"]]
+        data["missing"].extend(leftovers[BATCH_FALLBACK_MAX_SYMBOLS:])
+        leftovers = leftovers[:BATCH_FALLBACK_MAX_SYMBOLS]
+        if leftovers:
+            batch_stats["fallbacks"] += len(leftovers)
+
+            async def load(symbol: str) -> Optional[Dict[str, Any]]:
+                # Behind interactive single-symbol lookups in the quota queue
+                return await fetch_quote(symbol, api_key, PRIORITY_BACKGROUND)
+
+            quotes = await asyncio.gather(
+                *(quote_cache.get_or_load(symbol, load, priority=PRIORITY_BACKGROUND) for symbol in leftovers),
+                return_exceptions=True
+            )
+            for symbol, quote in zip(leftovers, quotes):
+                if isinstance(quote, BaseException):
+                    logger.warning(f"Error fetching quote for {symbol}: {str(quote)}")
+                    quote = None
+                if quote:
+                    data["stocks"][symbol] = quote
+                else:
+                    data["missing"].append(symbol)
+
+        # Keep the response ordered like the request
+        data["stocks"] = {symbol: data["stocks"][symbol] for symbol in symbols if symbol in data["stocks"]}
+        data["metrics"] = calculate_portfolio_metrics(data["stocks"])
+
+        return data
+
+    except Exception as e:
+        logger.error(f"Error fetching batch quotes: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
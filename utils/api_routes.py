@@ -1,6 +1,21 @@
 from fastapi import FastAPI, HTTPException, Body
-from datetime import datetime
-from utils.api_agent import fetch_market_data
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import asyncio
+import os
+import logging
+from utils.api_agent import (
+    fetch_market_data,
+    fetch_quotes_batch,
+    close_http_client,
+    alpha_vantage_limiter,
+    batch_stats
+)
+from utils.quote_cache import quote_cache
+from utils.market_refresher import market_refresher
+from utils.price_store import price_store
+from utils.portfolio_analytics import risk_summary_from_store
+from utils.streaming_analytics import streaming_analytics
 from utils.analysis_agent import (
     calculate_volatility,
     calculate_beta,
@@ -12,18 +27,76 @@ from utils.language_agent import (
     format_market_data,
     construct_prompt,
     generate_with_groq,
-    calculate_confidence
+    calculate_confidence,
+    close_groq_client,
+    stream_with_groq,
+    format_sse,
+    is_fallback_response,
+    StreamInterrupted
 )
-from utils.retriever_agent import search_documents
+from utils.retriever_agent import search_documents_async, embed_query_async, retriever, query_encoder
+from utils.metadata_index import SearchFilters
+from utils.hybrid_search import RERANK_ENABLED
+from utils.scraping_agent import close_scraper, scraper_stats
+from utils.news_feed import news_feed, recent_news
+from utils.fundamentals import fundamentals
+from utils.sentiment import sentiment_tracker
+from utils.response_cache import response_cache, context_hash
 from pydantic import BaseModel
+from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
+# Keep proxies from buffering Server-Sent Events
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# History used for overview risk analytics
+HISTORY_BENCHMARK = os.getenv("HISTORY_BENCHMARK", "SPY")
+HISTORY_LOOKBACK_DAYS = int(os.getenv("HISTORY_LOOKBACK_DAYS", "365"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    streaming_analytics.load()
+    # Load the cross-encoder now rather than inside the first query's latency budget
+    if RERANK_ENABLED:
+        await asyncio.to_thread(retriever.reranker.warm_up)
+    # Keep the overview watchlist warm in the background
+    market_refresher.start()
+    # Index freshly scraped news without blocking queries
+    news_feed.start()
+    # Refresh watchlist fundamentals ahead of their TTL
+    fundamentals.start(market_refresher.symbols)
+    history_sync = asyncio.create_task(
+        price_store.run_sync(market_refresher.symbols + [HISTORY_BENCHMARK])
+    )
+    yield
+    history_sync.cancel()
+    try:
+        await history_sync
+    except asyncio.CancelledError:
+        pass
+    await market_refresher.stop()
+    await news_feed.stop()
+    await fundamentals.stop()
+    fundamentals.close()
+    streaming_analytics.save()
+    response_cache.save()
+    retriever.save_if_dirty()
+    query_encoder.close()
+    # Release pooled upstream connections on shutdown
+    await close_http_client()
+    await close_groq_client()
+    await close_scraper()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Finance Assistant API",
     description="API for market analysis and insights",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -37,7 +110,6 @@ app.add_middleware(
 
 # Mount static directory for favicon
 from fastapi.staticfiles import StaticFiles
-import os
 static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static')
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
@@ -49,8 +121,12 @@ async def root():
         "message": "Finance Assistant API is running",
         "endpoints": {
             "market_overview": "/market/overview",
+            "market_quotes": "/market/quotes",
+            "news": "/news",
             "chat": "/chat",
-            "health": "/health"
+            "chat_stream": "/chat/stream",
+            "health": "/health",
+            "metrics": "/metrics"
         }
     }
 
@@ -62,19 +138,40 @@ async def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
+# Metrics endpoint
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        "status": "success",
+        "data": {
+            "quote_cache": quote_cache.stats(),
+            "market_refresher": market_refresher.stats(),
+            "alpha_vantage_limiter": alpha_vantage_limiter.stats(),
+            "batch_quotes": batch_stats,
+            "response_cache": response_cache.stats(),
+            "embedding_cache": retriever.embedding_cache.stats() if retriever.embedding_cache else None,
+            "reranker": retriever.reranker.stats(),
+            "query_encoder": query_encoder.stats(),
+            "scraper": scraper_stats(),
+            "news_feed": news_feed.stats(),
+            "fundamentals": fundamentals.stats()
+        }
+    }
+
 # Market overview endpoint
 @app.get("/market/overview")
 async def get_market_overview():
     try:
-        # Fetch market data for some default symbols
-        symbols = ["AAPL", "GOOGL", "MSFT", "AMZN"]
-        market_data = await fetch_market_data(symbols)
+        # Serve the latest background snapshot of the watchlist
+        market_data = await market_refresher.get_snapshot()
+        freshness = market_refresher.freshness()
         
         # Ensure we have valid data
         if not market_data or not market_data.get("stocks"):
             return {
                 "status": "success",
                 "data": {
+                    "freshness": freshness,
                     "market_data": {
                         "stocks": [],
                         "metrics": {
@@ -93,10 +190,22 @@ async def get_market_overview():
                 }
             }
         
+        # Prefer risk metrics from stored history, falling back to the snapshot
+        history = None
+        try:
+            start = datetime.now() - timedelta(days=HISTORY_LOOKBACK_DAYS)
+            history = risk_summary_from_store(price_store, list(market_data["stocks"]), HISTORY_BENCHMARK, start)
+        except Exception as e:
+            logger.warning(f"Error computing history analytics: {str(e)}")
+
         # Calculate analysis metrics with error handling
         try:
-            volatility = calculate_volatility(market_data["stocks"])
-            beta = calculate_beta(market_data["stocks"])
+            if history:
+                volatility = history["volatility"]
+                beta = history["beta"]
+            else:
+                volatility = calculate_volatility(market_data["stocks"])
+                beta = calculate_beta(market_data["stocks"])
         except (ValueError, ZeroDivisionError):
             volatility = 0
             beta = 0
@@ -112,58 +221,162 @@ async def get_market_overview():
         return {
             "status": "success",
             "data": {
+                "freshness": freshness,
                 "market_data": market_data,
                 "analysis": {
                     "volatility": float(volatility),  # Convert numpy float to Python float
                     "beta": float(beta),  # Convert numpy float to Python float
                     "insights": insights,
                     "risk_level": risk_level,
-                    "sentiment": sentiment
+                    "sentiment": sentiment,
+                    # Rolling news sentiment per symbol from the scraped articles
+                    "news_sentiment": sentiment_tracker.aggregate(list(market_data["stocks"])),
+                    "history": history,
+                    "streaming": streaming_analytics.snapshot(list(market_data["stocks"]))
                 }
             }
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+MAX_NEWS_ARTICLES = int(os.getenv("MAX_NEWS_ARTICLES", "50"))
+
+# Recent news endpoint; the feed indexes articles into this process's retriever
+@app.get("/news")
+async def get_news(query: str = "", max_articles: int = 5):
+    if not 0 < max_articles <= MAX_NEWS_ARTICLES:
+        raise HTTPException(status_code=400, detail=f"max_articles must be between 1 and {MAX_NEWS_ARTICLES}")
+    try:
+        articles = await asyncio.to_thread(recent_news, query, max_articles)
+        return {
+            "status": "success",
+            "data": articles
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Batch quotes request model
+class QuotesRequest(BaseModel):
+    symbols: List[str]
+
+MAX_BATCH_SYMBOLS = int(os.getenv("MAX_BATCH_SYMBOLS", "1000"))
+
+# Batch quotes endpoint
+@app.post("/market/quotes")
+async def get_market_quotes(request: QuotesRequest):
+    if not request.symbols:
+        raise HTTPException(status_code=400, detail="At least one symbol is required")
+    if len(request.symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SYMBOLS} symbols per request")
+
+    quotes = await fetch_quotes_batch(request.symbols)
+    return {
+        "status": "success",
+        "data": quotes
+    }
+
 # Chat request model
 class ChatRequest(BaseModel):
     query: str
+    filters: Optional[SearchFilters] = None
+
+async def prepare_chat(query: str, filters: Optional[SearchFilters] = None):
+    """Gather market data and context and build the prompt for a chat query"""
+    # Get market data
+    symbols = ["AAPL", "GOOGL", "MSFT", "AMZN"]
+    market_data = await fetch_market_data(symbols)
+    
+    # Search for relevant documents; the query is encoded together with concurrent requests
+    query_vector = await embed_query_async(query)
+    search_results = await search_documents_async(query, filters=filters, query_vector=query_vector)
+    context = "\n".join([r.text for r in search_results.results]) if search_results.results else ""
+    
+    # Format market data
+    market_summary = format_market_data(market_data)
+    
+    # Construct prompt
+    prompt = construct_prompt(
+        query=query,
+        context=context,
+        market_summary=market_summary
+    )
+    
+    # Answers can be reused only for the same market snapshot and context
+    cache_key = context_hash(market_summary, context)
+    return prompt, search_results, cache_key, query_vector
 
 # Chat endpoint
 @app.post("/chat")
 async def chat_endpoint(request: ChatRequest):
     try:
-        # Get market data
-        symbols = ["AAPL", "GOOGL", "MSFT", "AMZN"]
-        market_data = await fetch_market_data(symbols)
-        
-        # Search for relevant documents
-        search_results = search_documents(request.query)
-        context = "\n".join([r["text"] for r in search_results.results]) if search_results.results else ""
-        
-        # Format market data
-        market_summary = format_market_data(market_data)
+        prompt, search_results, cache_key, query_vector = await prepare_chat(request.query, request.filters)
         
-        # Construct prompt
-        prompt = construct_prompt(
-            query=request.query,
-            context=context,
-            market_summary=market_summary
-        )
+        # Serve near-duplicate questions from the response cache
+        query_vector = response_cache.normalize(query_vector)
+        cached = response_cache.lookup(query_vector, cache_key)
+        if cached:
+            entry, similarity = cached
+            return {
+                "status": "success",
+                "data": {
+                    "response": entry.response,
+                    "confidence": entry.confidence,
+                    "sources": entry.sources,
+                    "cached": True
+                }
+            }
         
         # Generate response
         response = await generate_with_groq(prompt)
         
         # Calculate confidence
         confidence = calculate_confidence(response, search_results.results)
+        sources = [r.metadata for r in search_results.results] if search_results.results else []
+        if not is_fallback_response(response):
+            response_cache.store(query_vector, request.query, cache_key, response, confidence, sources)
         
         return {
             "status": "success",
             "data": {
                 "response": response,
                 "confidence": confidence,
-                "sources": [r["metadata"] for r in search_results.results] if search_results.results else []
+                "sources": sources
             }
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Streaming chat endpoint
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    try:
+        prompt, search_results, cache_key, query_vector = await prepare_chat(request.query, request.filters)
+        query_vector = response_cache.normalize(query_vector)
+        cached = response_cache.lookup(query_vector, cache_key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        if cached:
+            entry, _ = cached
+            yield format_sse("token", {"token": entry.response})
+            yield format_sse("done", {"confidence": entry.confidence, "sources": entry.sources, "cached": True})
+            return
+
+        # Forward tokens as they arrive, then send sources and confidence last
+        response = ""
+        try:
+            async for token in stream_with_groq(prompt):
+                response += token
+                yield format_sse("token", {"token": token})
+        except StreamInterrupted as e:
+            # The client has a truncated answer: flag it and keep it out of the cache
+            yield format_sse("error", {"error": str(e), "partial": True})
+            return
+        confidence = calculate_confidence(response, search_results.results)
+        sources = [r.metadata for r in search_results.results] if search_results.results else []
+        if not is_fallback_response(response):
+            response_cache.store(query_vector, request.query, cache_key, response, confidence, sources)
+        yield format_sse("done", {"confidence": confidence, "sources": sources})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,41 @@
+from typing import List, Dict, Any
+from bs4 import BeautifulSoup
+from newspaper import Article
+
+# Runs inside the spawned parse pool, so this module imports nothing from the
+# rest of the app: each worker would otherwise open its own caches and clients
+
+def parse_listing(html: str, limit: int) -> List[str]:
+    """Article links on a Yahoo Finance news listing page (runs in the parse pool)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for article in soup.find_all('div', {'class': 'js-content-viewer'}):
+        anchor = article.find('a')
+        if not anchor or not anchor.get('href'):
+            continue
+        link = anchor['href']
+        if not link.startswith('http'):
+            link = f"https://finance.yahoo.com{link}"
+        if link not in links:
+            links.append(link)
+        if len(links) >= limit:
+            break
+    return links
+
+def parse_article(url: str, html: str) -> Dict[str, Any]:
+    """Extract an already-downloaded article with newspaper (runs in the parse pool)"""
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+    summary = ""
+    try:
+        article.nlp()
+        summary = article.summary
+    except Exception:
+        pass
+    return {
+        "title": article.title,
+        "summary": summary or article.meta_description or article.text[:500],
+        "text": article.text,
+        "published_at": article.publish_date
+    }
@@ -0,0 +1,209 @@
+from typing import Dict, Any, List, Optional, Tuple
+from array import array
+from collections import Counter
+import numpy as np
+import json
+import math
+import os
+import re
+import threading
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.'&-][a-z0-9]+)*")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; keeps tickers like BRK.B and terms like S&P together"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class Postings:
+    """Append-only doc id / term frequency lists backed by typed arrays"""
+
+    __slots__ = ("doc_ids", "freqs")
+
+    def __init__(self, doc_ids: Optional[array] = None, freqs: Optional[array] = None):
+        self.doc_ids = doc_ids if doc_ids is not None else array("i")
+        self.freqs = freqs if freqs is not None else array("i")
+
+    def append(self, doc_id: int, freq: int):
+        self.doc_ids.append(doc_id)
+        self.freqs.append(freq)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring, updated one document at a time"""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Postings] = {}
+        self.doc_lengths = array("i")
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, text: str) -> int:
+        """Index a document under the next doc id, which is returned"""
+        counts = Counter(tokenize(text))
+        with self._lock:
+            doc_id = len(self.doc_lengths)
+            for term, freq in counts.items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = Postings()
+                postings.append(doc_id, freq)
+            length = sum(counts.values())
+            self.doc_lengths.append(length)
+            self.total_length += length
+            return doc_id
+
+    def add_many(self, texts: List[str]):
+        for text in texts:
+            self.add(text)
+
+    def compact(self, keep: np.ndarray) -> "BM25Index":
+        """New index over the documents where keep is true, renumbered in order, without re-tokenizing.
+        Documents past the end of keep (appended since the mask was taken) are left out."""
+        size = len(keep)
+        new_ids = np.cumsum(keep, dtype=np.int64) - 1
+        compacted = BM25Index(self.k1, self.b)
+        with self._lock:
+            for term, postings in self.postings.items():
+                ids = np.frombuffer(postings.doc_ids, dtype=np.int32)
+                mask = ids < size
+                mask[mask] = keep[ids[mask]]
+                if mask.any():
+                    compacted.postings[term] = Postings(
+                        array("i", new_ids[ids[mask]].astype(np.int32).tobytes()),
+                        array("i", np.frombuffer(postings.freqs, dtype=np.int32)[mask].tobytes())
+                    )
+                # A live buffer view would make the next append to the postings fail
+                del ids
+            lengths = np.frombuffer(self.doc_lengths, dtype=np.int32)[:size][keep]
+            compacted.doc_lengths = array("i", lengths.tobytes())
+            compacted.total_length = int(lengths.sum())
+        return compacted
+
+    def truncate(self, size: int):
+        """Drop every document with id >= size, undoing a failed append"""
+        with self._lock:
+            for term in list(self.postings):
+                postings = self.postings[term]
+                while len(postings) and postings.doc_ids[-1] >= size:
+                    postings.doc_ids.pop()
+                    postings.freqs.pop()
+                if not len(postings):
+                    del self.postings[term]
+            while len(self.doc_lengths) > size:
+                self.total_length -= self.doc_lengths.pop()
+
+    def search(self, query: str, top_k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top-k (doc id, score) pairs; work grows with the query terms' postings, not the corpus"""
+        terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self.doc_lengths)
+            if not doc_count or top_k <= 0:
+                return []
+            avg_length = self.total_length / doc_count
+            lengths = np.frombuffer(self.doc_lengths, dtype=np.int32)
+
+            ids_parts = []
+            score_parts = []
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                doc_frequency = len(postings)
+                idf = math.log(1 + (doc_count - doc_frequency + 0.5) / (doc_frequency + 0.5))
+                ids = np.frombuffer(postings.doc_ids, dtype=np.int32).copy()
+                freqs = np.frombuffer(postings.freqs, dtype=np.int32).astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * lengths[ids] / avg_length)
+                ids_parts.append(ids)
+                score_parts.append(idf * freqs * (self.k1 + 1) / (freqs + norm))
+            # A live buffer view would make the next append to doc_lengths fail
+            del lengths
+
+        if not ids_parts:
+            return []
+
+        ids = np.concatenate(ids_parts)
+        scores = np.concatenate(score_parts)
+        if allowed is not None:
+            keep = np.isin(ids, allowed)
+            ids, scores = ids[keep], scores[keep]
+            if not len(ids):
+                return []
+
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores)
+        k = min(top_k, len(unique_ids))
+        best = np.argpartition(-totals, k - 1)[:k]
+        # Ties break towards the older document so results are stable
+        best = best[np.lexsort((unique_ids[best], -totals[best]))]
+        return [(int(unique_ids[i]), float(totals[i])) for i in best]
+
+    def save(self, path: str, corpus_hash: str = ""):
+        """Persist as CSR arrays so loading does not re-tokenize the corpus"""
+        with self._lock:
+            terms = list(self.postings)
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(self.postings[term]) for term in terms])
+            doc_ids = np.concatenate([np.frombuffer(self.postings[term].doc_ids, dtype=np.int32) for term in terms]) if terms else np.empty(0, dtype=np.int32)
+            freqs = np.concatenate([np.frombuffer(self.postings[term].freqs, dtype=np.int32) for term in terms]) if terms else np.empty(0, dtype=np.int32)
+            doc_lengths = np.array(self.doc_lengths, dtype=np.int32)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            terms=np.array(json.dumps(terms)),
+            offsets=offsets,
+            doc_ids=doc_ids,
+            freqs=freqs,
+            doc_lengths=doc_lengths,
+            corpus_hash=np.array(corpus_hash)
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, corpus_hash: str = "", k1: float = BM25_K1, b: float = BM25_B) -> Optional["BM25Index"]:
+        """Index saved by save(), or None if it is missing or was built from another corpus"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if corpus_hash and str(data["corpus_hash"]) != corpus_hash:
+                    return None
+                terms = json.loads(str(data["terms"]))
+                offsets = data["offsets"]
+                doc_ids = data["doc_ids"]
+                freqs = data["freqs"]
+                doc_lengths = data["doc_lengths"]
+        except Exception as e:
+            logger.warning(f"Failed to load BM25 index: {str(e)}")
+            return None
+
+        index = cls(k1, b)
+        for i, term in enumerate(terms):
+            start, end = offsets[i], offsets[i + 1]
+            index.postings[term] = Postings(array("i", doc_ids[start:end].tobytes()), array("i", freqs[start:end].tobytes()))
+        index.doc_lengths = array("i", doc_lengths.tobytes())
+        index.total_length = int(doc_lengths.sum())
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self.doc_lengths),
+            "terms": len(self.postings),
+            "postings": sum(len(postings) for postings in self.postings.values())
+        }
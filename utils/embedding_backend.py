@@ -0,0 +1,92 @@
+from typing import Dict, Any, Tuple
+import os
+import re
+import logging
+
+from sentence_transformers import SentenceTransformer
+import torch
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx_int8")
+
+# torch runs the model in PyTorch; onnx / onnx_int8 run it in ONNX Runtime,
+# the latter with dynamically quantized int8 weights
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "4"))
+# Instruction set the int8 kernels are quantized for: arm64, avx2, avx512 or avx512_vnni
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "avx2")
+EMBEDDING_EXPORT_DIR = os.getenv("EMBEDDING_EXPORT_DIR", "models")
+
+def embedding_model_id(model_name: str, backend: str = EMBEDDING_BACKEND) -> str:
+    """Identity of the vectors a model produces; quantized vectors must not mix with torch ones"""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+def _onnx_model_kwargs(threads: int) -> Dict[str, Any]:
+    import onnxruntime
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.intra_op_num_threads = threads
+    session_options.inter_op_num_threads = 1
+    return {"provider": "CPUExecutionProvider", "session_options": session_options}
+
+def _export_dir(model_name: str) -> str:
+    return os.path.join(EMBEDDING_EXPORT_DIR, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+
+def _quantized_file_name(quantization: str) -> str:
+    """File sentence-transformers writes for a dynamic int8 export, e.g. model_quint8_avx2.onnx"""
+    from optimum.onnxruntime import AutoQuantizationConfig
+
+    # The weight type depends on the instruction set (avx2 quantizes to uint8), so read it
+    # from the same config export_dynamic_quantized_onnx_model builds
+    config = getattr(AutoQuantizationConfig, quantization)(is_static=False)
+    return f"onnx/model_{config.weights_dtype.name.lower()}_{quantization}.onnx"
+
+def _load_quantized(model_name: str, threads: int, quantization: str) -> SentenceTransformer:
+    file_name = _quantized_file_name(quantization)
+    model_kwargs = _onnx_model_kwargs(threads)
+    try:
+        # Many hub models ship pre-quantized ONNX files
+        return SentenceTransformer(
+            model_name, device='cpu', backend="onnx", model_kwargs=dict(model_kwargs, file_name=file_name)
+        )
+    except Exception as e:
+        logger.info(f"No pre-quantized {file_name} for {model_name} ({str(e)}), quantizing locally")
+
+    export_dir = _export_dir(model_name)
+    if not os.path.exists(os.path.join(export_dir, file_name)):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        model = SentenceTransformer(model_name, device='cpu', backend="onnx", model_kwargs=model_kwargs)
+        model.save(export_dir)
+        export_dynamic_quantized_onnx_model(model, quantization, export_dir)
+    return SentenceTransformer(
+        export_dir, device='cpu', backend="onnx", model_kwargs=dict(model_kwargs, file_name=file_name)
+    )
+
+def load_embedding_model(
+    model_name: str,
+    backend: str = EMBEDDING_BACKEND,
+    threads: int = EMBEDDING_THREADS,
+    quantization: str = EMBEDDING_QUANTIZATION
+) -> Tuple[SentenceTransformer, str]:
+    """SentenceTransformer on the requested CPU backend and the backend actually used"""
+    if backend not in EMBEDDING_BACKENDS:
+        logger.warning(f"Unknown EMBEDDING_BACKEND {backend}, using torch")
+        backend = "torch"
+
+    if backend != "torch":
+        try:
+            if backend == "onnx_int8":
+                model = _load_quantized(model_name, threads, quantization)
+            else:
+                model = SentenceTransformer(model_name, device='cpu', backend="onnx", model_kwargs=_onnx_model_kwargs(threads))
+            logger.info(f"Loaded {model_name} on the {backend} backend with {threads} threads")
+            return model, backend
+        except Exception as e:
+            logger.warning(f"Failed to load {backend} backend, using torch: {str(e)}")
+
+    torch.set_num_threads(threads)
+    return SentenceTransformer(model_name, device='cpu'), "torch"
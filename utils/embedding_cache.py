@@ -0,0 +1,90 @@
+from typing import Dict, Any, List, Callable
+import numpy as np
+import hashlib
+import threading
+import logging
+
+from utils.sqlite_store import connect, select_many
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def content_hash(text: str, model_name: str) -> str:
+    """Cache key for a text embedded by a given model"""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """Persistent content hash -> float32 vector store in a SQLite BLOB table"""
+
+    def __init__(self, path: str, model_name: str):
+        self.path = path
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            rows = select_many(self._conn, "embeddings", "hash", "vector", keys)
+        return {key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows}
+
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rows = [(key, vector.shape[0], vector.tobytes()) for key, vector in zip(keys, vectors)]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (hash, dim, vector) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def encode(self, texts: List[str], encoder: Callable[[List[str]], Any]) -> np.ndarray:
+        """Embed texts, running the encoder only on ones not seen before"""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        keys = [content_hash(text, self.model_name) for text in texts]
+        try:
+            cached = self.get_many(keys)
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {str(e)}")
+            cached = {}
+
+        # Each distinct missing text is encoded once, even if it repeats in the batch
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        self.hits += len(texts) - sum(1 for key in keys if key in missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = np.asarray(encoder(list(missing.values())), dtype=np.float32)
+            cached.update(zip(missing, vectors))
+            try:
+                self.put_many(list(missing), vectors)
+            except Exception as e:
+                logger.warning(f"Embedding cache write failed: {str(e)}")
+
+        return np.stack([cached[key] for key in keys])
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
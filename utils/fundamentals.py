@@ -0,0 +1,179 @@
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import asyncio
+import os
+import time
+import logging
+
+import yfinance as yf
+
+from utils.quote_cache import QuoteCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# P/E, market cap and the like move slowly, so hours of staleness are fine
+FUNDAMENTALS_TTL = float(os.getenv("FUNDAMENTALS_TTL", "21600"))
+FUNDAMENTALS_WORKERS = int(os.getenv("FUNDAMENTALS_WORKERS", "4"))
+FUNDAMENTALS_TIMEOUT = float(os.getenv("FUNDAMENTALS_TIMEOUT", "20"))
+FUNDAMENTALS_MAX_ENTRIES = int(os.getenv("FUNDAMENTALS_MAX_ENTRIES", "5000"))
+FUNDAMENTALS_REFRESH_INTERVAL = float(os.getenv("FUNDAMENTALS_REFRESH_INTERVAL", "3600"))
+# How long a symbol yfinance knows nothing about is answered with None without asking again
+FUNDAMENTALS_NEGATIVE_TTL = float(os.getenv("FUNDAMENTALS_NEGATIVE_TTL", "300"))
+
+# Ticker.info returns well over a hundred keys; only these are kept
+FUNDAMENTAL_FIELDS = (
+    "shortName", "sector", "industry", "currency", "marketCap", "trailingPE", "forwardPE",
+    "dividendYield", "beta", "sharesOutstanding", "fiftyTwoWeekHigh", "fiftyTwoWeekLow",
+    "regularMarketPrice", "regularMarketChangePercent", "regularMarketVolume"
+)
+
+def fetch_info(symbol: str) -> Optional[Dict[str, Any]]:
+    """Blocking Ticker.info call, trimmed to FUNDAMENTAL_FIELDS"""
+    info = yf.Ticker(symbol).info
+    if not info:
+        return None
+    fields = {field: info.get(field) for field in FUNDAMENTAL_FIELDS}
+    # Unknown tickers come back as a stub dict with none of the fields set
+    if all(value is None for value in fields.values()):
+        return None
+    fields["fetched_at"] = datetime.now().isoformat()
+    return fields
+
+class FundamentalsService:
+    """Ticker.info behind a bounded thread pool and a long-TTL cache served stale-while-revalidate"""
+
+    def __init__(
+        self,
+        ttl: float = FUNDAMENTALS_TTL,
+        workers: int = FUNDAMENTALS_WORKERS,
+        timeout: float = FUNDAMENTALS_TIMEOUT,
+        max_entries: int = FUNDAMENTALS_MAX_ENTRIES,
+        refresh_interval: float = FUNDAMENTALS_REFRESH_INTERVAL,
+        negative_ttl: float = FUNDAMENTALS_NEGATIVE_TTL
+    ):
+        self.cache = QuoteCache(ttl=ttl, max_entries=max_entries)
+        self.workers = workers
+        self.timeout = timeout
+        self.refresh_interval = refresh_interval
+        self.negative_ttl = negative_ttl
+        # symbol -> when yfinance last returned nothing for it, oldest first
+        self._missing: Dict[str, float] = {}
+        self.symbols: List[str] = []
+        # yfinance blocks and is rate limited upstream, so calls queue here instead of piling up
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="yfinance")
+        self._background: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.loads = 0
+        self.failures = 0
+        self.load_time = 0.0
+
+    async def _load(self, symbol: str) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            info = await asyncio.wait_for(loop.run_in_executor(self._executor, fetch_info, symbol), self.timeout)
+            self._missing.pop(symbol, None)
+            if info is None:
+                self._missing[symbol] = time.monotonic()
+                while len(self._missing) > self.cache.max_entries:
+                    self._missing.pop(next(iter(self._missing)))
+            return info
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.loads += 1
+            self.load_time += time.perf_counter() - started
+
+    def peek(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Cached fundamentals regardless of age, without awaiting anything"""
+        entry = self.cache.get_entry(symbol.upper())
+        return entry.value if entry else None
+
+    def _refresh_in_background(self, symbol: str):
+        task = self._background.get(symbol)
+        if task is None or task.done():
+            task = asyncio.create_task(self.cache.get_or_load(symbol, self._load, force_refresh=True))
+            # Failures are counted in _load; keep them out of the "never retrieved" warnings
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._background[symbol] = task
+
+    async def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Fundamentals for a symbol; only a symbol never fetched before waits on yfinance"""
+        symbol = symbol.upper()
+        entry = self.cache.get_entry(symbol)
+        if entry is not None and self.cache.get(symbol) is None:
+            # Serve the stale copy now and refresh it behind the caller
+            self.stale_hits += 1
+            self._refresh_in_background(symbol)
+            return entry.value
+        missed_at = self._missing.get(symbol)
+        if missed_at is not None and time.monotonic() - missed_at < self.negative_ttl:
+            self.negative_hits += 1
+            return None
+        return await self.cache.get_or_load(symbol, self._load)
+
+    async def refresh_many(self, symbols: List[str]) -> int:
+        """Refetch a watchlist through the pool; returns how many symbols refreshed"""
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        results = await asyncio.gather(
+            *(self.cache.get_or_load(symbol, self._load, force_refresh=True) for symbol in symbols),
+            return_exceptions=True
+        )
+        refreshed = 0
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Error refreshing fundamentals for {symbol}: {str(result)}")
+            elif result is not None:
+                refreshed += 1
+        return refreshed
+
+    async def _run(self):
+        while True:
+            refreshed = await self.refresh_many(self.symbols)
+            logger.info(f"Refreshed fundamentals for {refreshed}/{len(self.symbols)} symbols")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self, symbols: List[str]):
+        """Keep a watchlist's fundamentals warm so lookups never wait on yfinance"""
+        self.symbols = list(symbols)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Fundamentals refresher started for {', '.join(self.symbols)} every {self.refresh_interval}s")
+
+    async def stop(self):
+        """Stop the refresh loop and background refreshes"""
+        for task in [self._task] + list(self._background.values()):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._task = None
+        self._background = {}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.cache.stats(),
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+            "negative_entries": len(self._missing),
+            "workers": self.workers,
+            "loads": self.loads,
+            "failures": self.failures,
+            "mean_load_ms": self.load_time / self.loads * 1000 if self.loads else 0.0,
+            "refresh_interval": self.refresh_interval,
+            "watchlist": self.symbols
+        }
+
+# Shared fundamentals service
+fundamentals = FundamentalsService()
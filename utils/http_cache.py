@@ -0,0 +1,231 @@
+from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from datetime import datetime
+import hashlib
+import json
+import re
+import threading
+import time
+import os
+import logging
+
+from utils.sqlite_store import connect, prune_rows
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCRAPER_CACHE_PATH = os.getenv("SCRAPER_CACHE_PATH", "data/scraper_cache.sqlite")
+# Listing pages churn within hours; older copies are never revalidated again
+HTTP_CACHE_MAX_AGE_DAYS = float(os.getenv("HTTP_CACHE_MAX_AGE_DAYS", "7"))
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "5000"))
+# Kept past the news retention window so expired stories are not re-parsed if they resurface
+ARTICLE_STORE_MAX_AGE_DAYS = float(os.getenv("ARTICLE_STORE_MAX_AGE_DAYS", "60"))
+ARTICLE_STORE_MAX_ENTRIES = int(os.getenv("ARTICLE_STORE_MAX_ENTRIES", "50000"))
+
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+def content_hash(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8", errors="ignore")).hexdigest()
+
+@dataclass
+class CachedPage:
+    url: str
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def validators(self) -> Dict[str, str]:
+        """Headers that turn the next GET into a conditional request"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+def expires_from(cache_control: Optional[str]) -> Optional[float]:
+    """Expiry time from Cache-Control; None when the response must not be stored"""
+    cache_control = (cache_control or "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+    match = MAX_AGE_PATTERN.search(cache_control)
+    return time.time() + int(match.group(1)) if match else 0.0
+
+class HttpCache:
+    """Persistent response cache revalidated with ETag / Last-Modified conditional requests"""
+
+    def __init__(self, path: str = SCRAPER_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS http_cache_fetched_at ON http_cache (fetched_at)")
+        self._conn.commit()
+        self.pruned = 0
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, expires_at FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, expires_at = row
+        return CachedPage(url=url, body=body, etag=etag, last_modified=last_modified, expires_at=expires_at)
+
+    def store(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str], cache_control: Optional[str]):
+        self.misses += 1
+        self.bytes_downloaded += len(body)
+        expires_at = expires_from(cache_control)
+        # Without validators or a max-age the copy could never be reused
+        if expires_at is None or not (etag or last_modified or expires_at > time.time()):
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body, expires_at, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, expires_at, time.time())
+            )
+            self._conn.commit()
+
+    def record_fresh_hit(self, page: CachedPage):
+        self.fresh_hits += 1
+        self.bytes_saved += len(page.body)
+
+    def record_not_modified(self, page: CachedPage, cache_control: Optional[str]):
+        """A 304 confirmed the cached copy; extend its freshness"""
+        self.revalidated += 1
+        self.bytes_saved += len(page.body)
+        expires_at = expires_from(cache_control)
+        if expires_at:
+            with self._lock:
+                self._conn.execute("UPDATE http_cache SET expires_at = ? WHERE url = ?", (expires_at, page.url))
+                self._conn.commit()
+
+    def prune(self, max_age_days: float = HTTP_CACHE_MAX_AGE_DAYS, max_entries: int = HTTP_CACHE_MAX_ENTRIES) -> int:
+        """Drop pages fetched too long ago and the oldest beyond max_entries"""
+        with self._lock:
+            removed = prune_rows(self._conn, "http_cache", "fetched_at", max_age_days * 86400, max_entries)
+        self.pruned += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.fresh_hits + self.revalidated + self.misses
+        return {
+            "fresh_hits": self.fresh_hits,
+            "not_modified": self.revalidated,
+            "misses": self.misses,
+            "hit_ratio": (self.fresh_hits + self.revalidated) / requests if requests else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "bytes_downloaded": self.bytes_downloaded,
+            "pruned": self.pruned
+        }
+
+class ArticleStore:
+    """Parsed articles keyed by URL and by content hash, so nothing is downloaded or parsed twice"""
+
+    def __init__(self, path: str = SCRAPER_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, parsed TEXT NOT NULL, first_seen REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS articles_content_hash ON articles (content_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS articles_first_seen ON articles (first_seen)")
+        self._conn.commit()
+        self.pruned = 0
+        self.url_hits = 0
+        self.content_hits = 0
+        self.parsed = 0
+
+    @staticmethod
+    def _decode(parsed: str, first_seen: float) -> Dict[str, Any]:
+        article = json.loads(parsed)
+        if article.get("published_at"):
+            article["published_at"] = datetime.fromisoformat(article["published_at"])
+        # Stands in for the publish date of articles that have none
+        article["first_seen"] = datetime.fromtimestamp(first_seen)
+        return article
+
+    def get_by_url(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT parsed, first_seen FROM articles WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        self.url_hits += 1
+        return self._decode(*row)
+
+    def get_by_content(self, url: str, body_hash: str) -> Optional[Dict[str, Any]]:
+        """Parsed copy of identical content seen under another URL, recorded under this one too"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT parsed, first_seen FROM articles WHERE content_hash = ? ORDER BY first_seen LIMIT 1",
+                (body_hash,)
+            ).fetchone()
+            if row is None:
+                return None
+            # The story was first seen when its content was, whichever URL it came from
+            self._conn.execute(
+                "INSERT OR IGNORE INTO articles (url, content_hash, parsed, first_seen) VALUES (?, ?, ?, ?)",
+                (url, body_hash, row[0], row[1])
+            )
+            self._conn.commit()
+        self.content_hits += 1
+        return self._decode(*row)
+
+    def put(self, url: str, body_hash: str, article: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a parsed article; returns it as get_by_url will, first_seen included"""
+        self.parsed += 1
+        first_seen = time.time()
+        published_at = article.get("published_at")
+        record = dict(article, published_at=published_at.isoformat() if published_at else None)
+        record.pop("first_seen", None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles (url, content_hash, parsed, first_seen) VALUES (?, ?, ?, ?)",
+                (url, body_hash, json.dumps(record), first_seen)
+            )
+            self._conn.commit()
+        return dict(article, first_seen=datetime.fromtimestamp(first_seen))
+
+    def prune(
+        self, max_age_days: float = ARTICLE_STORE_MAX_AGE_DAYS, max_entries: int = ARTICLE_STORE_MAX_ENTRIES
+    ) -> int:
+        """Drop articles first seen too long ago and the oldest beyond max_entries"""
+        with self._lock:
+            removed = prune_rows(self._conn, "articles", "first_seen", max_age_days * 86400, max_entries)
+        self.pruned += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.url_hits + self.content_hits + self.parsed
+        return {
+            "url_hits": self.url_hits,
+            "content_hits": self.content_hits,
+            "parsed": self.parsed,
+            "pruned": self.pruned,
+            "dedupe_ratio": (self.url_hits + self.content_hits) / lookups if lookups else 0.0
+        }
+
+# Shared scraper caches
+http_cache = HttpCache()
+article_store = ArticleStore()
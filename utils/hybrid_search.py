@@ -0,0 +1,124 @@
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import numpy as np
+import threading
+import time
+import os
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RRF_K = int(os.getenv("RRF_K", "60"))
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "20"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Fuse ranked doc id lists; scores are scaled so first place in every list is 1.0"""
+    if not rankings:
+        return []
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    best_possible = len(rankings) / (k + 1)
+    fused = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [(doc_id, score / best_possible) for doc_id, score in fused]
+
+class CrossEncoderReranker:
+    """Small CPU cross-encoder that reorders the top candidates within a latency budget"""
+
+    def __init__(self, model_name: str = RERANK_MODEL, budget_ms: float = RERANK_BUDGET_MS, top_n: int = RERANK_TOP_N):
+        self.model_name = model_name
+        self.budget_ms = budget_ms
+        self.top_n = top_n
+        self.model = None
+        self._load_failed = False
+        self._load_lock = threading.Lock()
+        # One worker: a timed-out rerank finishes in the background instead of piling up
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        # Held from submit until the prediction finishes; a query finding it taken skips reranking
+        self._busy = threading.Lock()
+        self._ms_per_pair: Optional[float] = None
+        self.reranked = 0
+        self.skipped = 0
+        self.timed_out = 0
+
+    def _get_model(self):
+        with self._load_lock:
+            if self.model is None and not self._load_failed:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    self.model = CrossEncoder(self.model_name, device='cpu')
+                    logger.info(f"Loaded cross-encoder {self.model_name}")
+                except Exception as e:
+                    logger.warning(f"Failed to load cross-encoder: {str(e)}")
+                    self._load_failed = True
+            return self.model
+
+    def _max_pairs(self) -> int:
+        # Shrink the candidate list when past runs show the full list would blow the budget
+        if not self._ms_per_pair:
+            return self.top_n
+        return max(1, min(self.top_n, int(self.budget_ms / self._ms_per_pair)))
+
+    def _predict(self, model, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        started = time.perf_counter()
+        try:
+            return np.asarray(model.predict(pairs), dtype=np.float32)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            per_pair = elapsed_ms / len(pairs)
+            self._ms_per_pair = per_pair if self._ms_per_pair is None else 0.8 * self._ms_per_pair + 0.2 * per_pair
+            self._busy.release()
+
+    def warm_up(self):
+        """Load the model and run one prediction so the first query does not pay for either"""
+        model = self._get_model()
+        if model is not None:
+            with self._busy:
+                model.predict([("warm up", "warm up")])
+
+    def rerank(self, query: str, candidates: List[Tuple[int, str]]) -> Optional[List[Tuple[int, float]]]:
+        """(doc id, relevance in [0, 1]) best first, or None to keep the incoming order"""
+        model = self._get_model()
+        # acquire(blocking=False) tests and takes the slot in one step, so two queries
+        # can never both submit
+        if model is None or not candidates or not self._busy.acquire(blocking=False):
+            self.skipped += 1
+            return None
+
+        candidates = candidates[:self._max_pairs()]
+        try:
+            future = self._executor.submit(self._predict, model, [(query, text) for _, text in candidates])
+        except Exception:
+            self._busy.release()
+            raise
+        try:
+            logits = future.result(timeout=self.budget_ms / 1000)
+        except FutureTimeoutError:
+            self.timed_out += 1
+            return None
+        except Exception as e:
+            logger.error(f"Error reranking: {str(e)}")
+            return None
+
+        self.reranked += 1
+        relevance = 1 / (1 + np.exp(-logits))
+        order = np.argsort(-relevance, kind="stable")
+        return [(candidates[i][0], float(relevance[i])) for i in order]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "loaded": self.model is not None,
+            "budget_ms": self.budget_ms,
+            "ms_per_pair": self._ms_per_pair,
+            "max_pairs": self._max_pairs(),
+            "reranked": self.reranked,
+            "skipped": self.skipped,
+            "timed_out": self.timed_out
+        }
@@ -0,0 +1,275 @@
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+import argparse
+import json
+import os
+import time
+import logging
+
+import numpy as np
+
+from utils.retriever_agent import RetrieverAgent, retriever, VECTOR_STORE_DIR
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "200"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "40"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_BLOCK_SIZE = int(os.getenv("INGEST_BLOCK_SIZE", "4096"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))
+# Saving writes the whole index, so checkpoints are spaced by chunks ingested or time passed, never per file
+INGEST_CHECKPOINT_CHUNKS = int(os.getenv("INGEST_CHECKPOINT_CHUNKS", "100000"))
+INGEST_CHECKPOINT_SECONDS = float(os.getenv("INGEST_CHECKPOINT_SECONDS", "600"))
+INGEST_CHECKPOINT_PATH = os.getenv("INGEST_CHECKPOINT_PATH", os.path.join(VECTOR_STORE_DIR, "ingest_checkpoint.json"))
+
+TEXT_EXTENSIONS = (".txt", ".md")
+
+def chunk_text(text: str, chunk_size: int = INGEST_CHUNK_SIZE, overlap: int = INGEST_CHUNK_OVERLAP) -> List[str]:
+    """Split text into overlapping word windows"""
+    words = text.split()
+    if len(words) <= chunk_size:
+        return [" ".join(words)] if words else []
+    step = max(1, chunk_size - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_size]))
+        if start + chunk_size >= len(words):
+            break
+    return chunks
+
+def list_sources(paths: List[str]) -> List[str]:
+    """Expand directories into the JSONL and text files under them, in a stable order"""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(".jsonl") or name.endswith(TEXT_EXTENSIONS):
+                        sources.append(os.path.join(root, name))
+        else:
+            sources.append(path)
+    return sources
+
+def read_records(source: str, skip: int = 0) -> Iterator[Dict[str, Any]]:
+    """Stream documents from a JSONL file, or a text file as one document"""
+    if not source.endswith(".jsonl"):
+        if skip == 0:
+            with open(source, "r", errors="ignore") as f:
+                yield {"text": f.read(), "metadata": {"source": os.path.basename(source)}}
+        return
+
+    with open(source, "r") as f:
+        for line_number, line in enumerate(f):
+            if line_number < skip:
+                continue
+            line = line.strip()
+            if not line:
+                yield {}
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping bad JSON in {source} line {line_number + 1}: {str(e)}")
+                record = {}
+            yield record if isinstance(record, dict) else {}
+
+class IngestCheckpoint:
+    """Records consumed per source, written only after the index holding them is saved"""
+
+    def __init__(self, path: str = INGEST_CHECKPOINT_PATH):
+        self.path = path
+        self.positions: Dict[str, int] = {}
+        self.completed: List[str] = []
+        self.documents = 0
+        self.chunks = 0
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            state = json.load(f)
+        self.positions = state.get("positions", {})
+        self.completed = state.get("completed", [])
+        self.documents = state.get("documents", 0)
+        self.chunks = state.get("chunks", 0)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "positions": self.positions,
+                "completed": self.completed,
+                "documents": self.documents,
+                "chunks": self.chunks
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class Embedder:
+    """Batched encoder over the retriever's model, optionally spread over worker processes"""
+
+    def __init__(self, agent: RetrieverAgent, batch_size: int = INGEST_BATCH_SIZE, workers: int = INGEST_WORKERS):
+        self.agent = agent
+        self.model = agent.model
+        self.batch_size = batch_size
+        self.pool = None
+        if self.model and workers > 1:
+            self.pool = self.model.start_multi_process_pool(["cpu"] * workers)
+
+    def encode(self, texts: List[str]) -> Optional[np.ndarray]:
+        if not self.model:
+            return None
+        # Chunks already embedded by an earlier run come from the embedding cache
+        return self.agent.encode(texts, self._encode_uncached)
+
+    def _encode_uncached(self, texts: List[str]) -> np.ndarray:
+        if self.pool:
+            vectors = self.model.encode_multi_process(texts, self.pool, batch_size=self.batch_size)
+        else:
+            vectors = self.model.encode(texts, batch_size=self.batch_size)
+        return np.asarray(vectors, dtype='float32')
+
+    def close(self):
+        if self.pool:
+            self.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+def ingest(
+    paths: List[str],
+    agent: RetrieverAgent = retriever,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    chunk_overlap: int = INGEST_CHUNK_OVERLAP,
+    batch_size: int = INGEST_BATCH_SIZE,
+    block_size: int = INGEST_BLOCK_SIZE,
+    workers: int = INGEST_WORKERS,
+    checkpoint_chunks: int = INGEST_CHECKPOINT_CHUNKS,
+    checkpoint_seconds: float = INGEST_CHECKPOINT_SECONDS,
+    checkpoint_path: str = INGEST_CHECKPOINT_PATH,
+    restart: bool = False
+) -> Dict[str, Any]:
+    """Chunk, embed and append documents in large blocks, resuming from the last checkpoint"""
+    checkpoint = IngestCheckpoint(checkpoint_path)
+    if restart:
+        checkpoint.clear()
+    else:
+        checkpoint.load()
+        if checkpoint.documents:
+            logger.info(f"Resuming ingest after {checkpoint.documents} documents")
+
+    embedder = Embedder(agent, batch_size, workers)
+    started = time.perf_counter()
+    documents = 0
+    chunks = 0
+    saved_chunks = 0
+    saved_at = started
+    pending: List[Dict[str, Any]] = []
+    # (source, records consumed), or (source, None) once the whole source is consumed
+    pending_positions: List[Tuple[str, Optional[int]]] = []
+
+    def flush():
+        nonlocal chunks
+        if pending:
+            agent.add_documents(list(pending), embedder.encode([doc['text'] for doc in pending]))
+            chunks += len(pending)
+            checkpoint.chunks += len(pending)
+        # Only records whose chunks are all in the index count as consumed
+        for source, position in pending_positions:
+            if position is None:
+                checkpoint.completed.append(source)
+                checkpoint.positions.pop(source, None)
+            else:
+                checkpoint.positions[source] = position
+        pending.clear()
+        pending_positions.clear()
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Ingested {documents} documents / {chunks} chunks "
+            f"({documents / elapsed:.1f} docs/s, {chunks / elapsed:.1f} chunks/s)"
+        )
+        if chunks - saved_chunks >= checkpoint_chunks or time.perf_counter() - saved_at >= checkpoint_seconds:
+            save()
+
+    def save():
+        nonlocal saved_chunks, saved_at
+        agent.save_index()
+        checkpoint.save()
+        saved_chunks = chunks
+        saved_at = time.perf_counter()
+
+    try:
+        for source in list_sources(paths):
+            if source in checkpoint.completed:
+                continue
+            position = checkpoint.positions.get(source, 0)
+            for record in read_records(source, skip=position):
+                position += 1
+                text = record.get("text")
+                if text:
+                    metadata = dict(record.get("metadata") or {})
+                    metadata.setdefault("source", os.path.basename(source))
+                    pieces = chunk_text(text, chunk_size, chunk_overlap)
+                    for chunk_index, piece in enumerate(pieces):
+                        chunk_metadata = dict(metadata, chunk=chunk_index) if len(pieces) > 1 else metadata
+                        pending.append({"text": piece, "metadata": chunk_metadata})
+                    documents += 1
+                    checkpoint.documents += 1
+                pending_positions.append((source, position))
+                # Blocks end on record boundaries so a checkpoint never splits a document
+                if len(pending) >= block_size:
+                    flush()
+            # Small files share blocks; the source is marked done once its last chunks are flushed
+            pending_positions.append((source, None))
+
+        flush()
+        agent.retrain_index()
+        save()
+        checkpoint.clear()
+    finally:
+        embedder.close()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "documents": documents,
+        "chunks": chunks,
+        "seconds": elapsed,
+        "docs_per_second": documents / elapsed if elapsed else 0.0,
+        "chunks_per_second": chunks / elapsed if elapsed else 0.0,
+        "index_size": agent.index.ntotal if agent.index is not None else len(agent.documents)
+    }
+    logger.info(f"Ingest finished: {summary}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-ingest JSONL files and text directories into the vector store")
+    parser.add_argument("paths", nargs="+", help="JSONL files ({\"text\", \"metadata\"} per line) or directories")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="words per chunk")
+    parser.add_argument("--chunk-overlap", type=int, default=INGEST_CHUNK_OVERLAP, help="words shared by neighbouring chunks")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="texts per model forward pass")
+    parser.add_argument("--block-size", type=int, default=INGEST_BLOCK_SIZE, help="chunks per index append")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="encoder processes (0 or 1 encodes in-process)")
+    parser.add_argument("--checkpoint-chunks", type=int, default=INGEST_CHECKPOINT_CHUNKS, help="chunks between checkpoints")
+    parser.add_argument("--checkpoint-seconds", type=float, default=INGEST_CHECKPOINT_SECONDS, help="seconds between checkpoints")
+    parser.add_argument("--checkpoint", default=INGEST_CHECKPOINT_PATH, help="checkpoint file")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and start over")
+    args = parser.parse_args()
+
+    summary = ingest(
+        args.paths,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        batch_size=args.batch_size,
+        block_size=args.block_size,
+        workers=args.workers,
+        checkpoint_chunks=args.checkpoint_chunks,
+        checkpoint_seconds=args.checkpoint_seconds,
+        checkpoint_path=args.checkpoint,
+        restart=args.restart
+    )
+    print(json.dumps(summary, indent=2))
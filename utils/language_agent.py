@@ -1,12 +1,16 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, AsyncIterator
 import os
 from dotenv import load_dotenv
 import logging
 from datetime import datetime
-from groq import Groq
-import time
+import groq
+from groq import AsyncGroq
+import httpx
+import asyncio
+import random
+import json
 
 # Load environment variables
 load_dotenv()
@@ -15,8 +19,16 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Groq client
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Groq client configuration; GROQ_BASE_URL can point at a local mock server
+GROQ_MODEL = os.getenv("GROQ_MODEL", "qwen-qwq-32b")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+GROQ_BACKOFF_BASE = float(os.getenv("GROQ_BACKOFF_BASE", "1"))
+
+# Shared async client and cap on in-flight completions
+_client: Optional[AsyncGroq] = None
+_semaphore = asyncio.Semaphore(GROQ_MAX_CONCURRENCY)
 
 # Fallback responses for when API is unavailable
 FALLBACK_RESPONSES = [
@@ -26,6 +38,9 @@ FALLBACK_RESPONSES = [
     "I'm unable to provide a detailed response at the moment. Please try again in a few minutes."
 ]
 
+class StreamInterrupted(Exception):
+    """Raised when a stream fails after tokens were already sent; the client holds a partial answer"""
+
 class GenerationRequest(BaseModel):
     query: str
     context: List[Dict[str, Any]]
@@ -42,6 +57,13 @@ def format_market_data(market_data: Dict[str, Any]) -> str:
         stocks = market_data.get("stocks", [])
         metrics = market_data.get("metrics", {})
         
+        # fetch_market_data keys stocks by symbol; the UI sends a list
+        if isinstance(stocks, dict):
+            stocks = [
+                {"symbol": symbol, "price": stock["price"], "change": stock.get("change_percent", stock.get("change", 0))}
+                for symbol, stock in stocks.items()
+            ]
+        
         summary = "Market Overview:\n"
         
         # Add stock information
@@ -78,35 +100,128 @@ Please provide a clear and concise response based on the available information.
 """
     return prompt
 
+def get_groq_client() -> AsyncGroq:
+    """Return the shared async Groq client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = AsyncGroq(
+            api_key=os.getenv("GROQ_API_KEY"),
+            base_url=GROQ_BASE_URL,
+            timeout=GROQ_TIMEOUT,
+            # Retries are handled in generate_with_groq so backoff stays non-blocking
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                timeout=GROQ_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=GROQ_MAX_CONCURRENCY,
+                    max_keepalive_connections=GROQ_MAX_CONCURRENCY
+                )
+            )
+        )
+    return _client
+
+async def close_groq_client():
+    """Close the shared Groq client and release its connections"""
+    global _client
+    if _client is not None:
+        await _client.close()
+    _client = None
+
+def build_messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": "You are a helpful financial analysis assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+def is_retryable_error(error: Exception) -> bool:
+    """Rate limits, timeouts, connection failures and 5xx responses are worth retrying"""
+    if isinstance(error, (groq.RateLimitError, groq.APITimeoutError, groq.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, groq.APIStatusError) and error.status_code >= 500:
+        return True
+    error_msg = str(error)
+    return "insufficient_quota" in error_msg or "429" in error_msg
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, GROQ_BACKOFF_BASE * (2 ** attempt))
+
 async def generate_with_groq(prompt: str, max_retries: int = 3) -> str:
     """Generate a response using Groq's API with retry logic"""
     for attempt in range(max_retries):
         try:
-            response = client.chat.completions.create(
-                model="qwen-qwq-32b",
-                messages=[
-                    {"role": "system", "content": "You are a helpful financial analysis assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
+            async with _semaphore:
+                response = await asyncio.wait_for(
+                    get_groq_client().chat.completions.create(
+                        model=GROQ_MODEL,
+                        messages=build_messages(prompt),
+                        temperature=0.7,
+                        max_tokens=500
+                    ),
+                    timeout=GROQ_TIMEOUT
+                )
             return response.choices[0].message.content
         except Exception as e:
-            error_msg = str(e)
+            error_msg = str(e) or type(e).__name__
             logger.error(f"Error calling Groq API (attempt {attempt + 1}/{max_retries}): {error_msg}")
             
-            # Check for quota exceeded error
-            if "insufficient_quota" in error_msg or "429" in error_msg:
+            # Retry transient failures such as quota exhaustion and timeouts
+            if is_retryable_error(e):
                 if attempt == max_retries - 1:  # Last attempt
                     return FALLBACK_RESPONSES[attempt % len(FALLBACK_RESPONSES)]
-                time.sleep(2 ** attempt)  # Exponential backoff
+                await asyncio.sleep(backoff_delay(attempt))  # Exponential backoff
             else:
                 return "I apologize, but I encountered an error while processing your request. Please try again later."
     
     return FALLBACK_RESPONSES[-1]
 
-def calculate_confidence(response: str, search_results: List[Dict[str, Any]]) -> float:
+async def stream_with_groq(prompt: str, max_retries: int = 3) -> AsyncIterator[str]:
+    """Stream response tokens from Groq as they are generated"""
+    for attempt in range(max_retries):
+        emitted = False
+        try:
+            async with _semaphore:
+                stream = await asyncio.wait_for(
+                    get_groq_client().chat.completions.create(
+                        model=GROQ_MODEL,
+                        messages=build_messages(prompt),
+                        temperature=0.7,
+                        max_tokens=500,
+                        stream=True
+                    ),
+                    timeout=GROQ_TIMEOUT
+                )
+                async for chunk in stream:
+                    token = chunk.choices[0].delta.content if chunk.choices else None
+                    if token:
+                        emitted = True
+                        yield token
+            return
+        except Exception as e:
+            error_msg = str(e) or type(e).__name__
+            logger.error(f"Error streaming from Groq API (attempt {attempt + 1}/{max_retries}): {error_msg}")
+
+            # Only retry before any tokens reached the client
+            if emitted:
+                raise StreamInterrupted(error_msg) from e
+            if is_retryable_error(e):
+                if attempt == max_retries - 1:
+                    yield FALLBACK_RESPONSES[attempt % len(FALLBACK_RESPONSES)]
+                    return
+                await asyncio.sleep(backoff_delay(attempt))
+            else:
+                yield "I apologize, but I encountered an error while processing your request. Please try again later."
+                return
+
+def is_fallback_response(response: str) -> bool:
+    """True for the canned replies returned when generation failed"""
+    return response in FALLBACK_RESPONSES or response.startswith("I apologize, but I encountered an error")
+
+def format_sse(event: str, data: Any) -> str:
+    """Format a Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def calculate_confidence(response: str, search_results: List[Any]) -> float:
     """Calculate confidence score for the response"""
     try:
         # Simple confidence calculation based on response length and search results
@@ -116,9 +231,12 @@ def calculate_confidence(response: str, search_results: List[Dict[str, Any]]) ->
         if len(response) > 100:
             base_confidence += 0.2
         
-        # Adjust based on search results
+        # Adjust based on how relevant the best retrieved documents scored
         if search_results:
-            base_confidence += 0.3
+            scores = [getattr(result, "score", None) for result in search_results]
+            scores = sorted((score for score in scores if score is not None), reverse=True)
+            relevance = sum(scores[:3]) / len(scores[:3]) if scores else 1.0
+            base_confidence += 0.3 * min(max(relevance, 0.0), 1.0)
         
         return min(base_confidence, 1.0)
     except Exception as e:
@@ -0,0 +1,134 @@
+from typing import Dict, Any, List, Optional
+import asyncio
+import os
+import time
+import logging
+
+from utils.api_agent import fetch_market_data, CALLS_PER_DAY
+from utils.rate_limiter import PRIORITY_BACKGROUND
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MARKET_WATCHLIST = [
+    symbol.strip().upper()
+    for symbol in os.getenv("MARKET_WATCHLIST", "AAPL,GOOGL,MSFT,AMZN").split(",")
+    if symbol.strip()
+]
+# Unset means derived from the daily quota; see refresh_interval_for
+MARKET_REFRESH_INTERVAL = float(os.getenv("MARKET_REFRESH_INTERVAL", "0")) or None
+# Share of the Alpha Vantage daily quota the background refresh may spend
+MARKET_REFRESH_BUDGET_SHARE = float(os.getenv("MARKET_REFRESH_BUDGET_SHARE", "0.5"))
+MARKET_REFRESH_MIN_INTERVAL = float(os.getenv("MARKET_REFRESH_MIN_INTERVAL", "60"))
+
+def refresh_interval_for(symbols: List[str], calls_per_day: float = CALLS_PER_DAY,
+                         share: float = MARKET_REFRESH_BUDGET_SHARE) -> float:
+    """Shortest interval at which refreshing symbols stays within its share of the daily quota"""
+    # Every refresh costs one upstream call per symbol
+    calls_per_refresh = max(1, len(symbols))
+    return max(MARKET_REFRESH_MIN_INTERVAL, 86400 * calls_per_refresh / max(1.0, calls_per_day * share))
+
+class MarketRefresher:
+    """Keeps a market snapshot of the watchlist fresh in the background"""
+
+    def __init__(self, symbols: List[str] = None, interval: Optional[float] = MARKET_REFRESH_INTERVAL):
+        self.symbols = symbols or MARKET_WATCHLIST
+        self.interval = interval or refresh_interval_for(self.symbols)
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._refreshed_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.last_error: Optional[str] = None
+        self.refresh_count = 0
+        self.failure_count = 0
+
+    async def _do_refresh(self):
+        try:
+            self._snapshot = await fetch_market_data(
+                self.symbols,
+                force_refresh=True,
+                priority=PRIORITY_BACKGROUND
+            )
+            self._refreshed_at = time.monotonic()
+            self.last_error = None
+            self.refresh_count += 1
+        except Exception as e:
+            self.last_error = str(e)
+            self.failure_count += 1
+            logger.warning(f"Error refreshing market snapshot: {str(e)}")
+
+    async def refresh(self):
+        """Refresh the snapshot, joining a refresh that is already running"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._do_refresh())
+        await asyncio.shield(self._refresh_task)
+
+    def trigger_refresh(self):
+        """Start a refresh in the background without waiting for it"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._do_refresh())
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the periodic refresh loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Market refresher started for {', '.join(self.symbols)} every {self.interval:.0f}s")
+
+    async def stop(self):
+        """Stop the refresh loop and any refresh in progress"""
+        for task in (self._task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._refresh_task = None
+
+    def age(self) -> Optional[float]:
+        if self._refreshed_at is None:
+            return None
+        return time.monotonic() - self._refreshed_at
+
+    def is_stale(self) -> bool:
+        age = self.age()
+        return age is None or age > self.interval
+
+    async def get_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Return the latest snapshot immediately, revalidating it in the background if stale"""
+        if self._snapshot is None:
+            # Nothing to serve yet, so the first caller waits for one refresh
+            await self.refresh()
+        elif self.is_stale():
+            self.trigger_refresh()
+        return self._snapshot
+
+    def freshness(self) -> Dict[str, Any]:
+        """Describe how current the served snapshot is"""
+        age = self.age()
+        return {
+            "as_of": self._snapshot.get("timestamp") if self._snapshot else None,
+            "age_seconds": round(age, 3) if age is not None else None,
+            "refresh_interval": self.interval,
+            "stale": self.is_stale(),
+            "refreshing": self._refresh_task is not None and not self._refresh_task.done(),
+            "last_error": self.last_error
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": self.symbols,
+            "refresh_count": self.refresh_count,
+            "failure_count": self.failure_count,
+            **self.freshness()
+        }
+
+# Shared refresher for the market overview watchlist
+market_refresher = MarketRefresher()
@@ -0,0 +1,138 @@
+from typing import Dict, Any, List, Optional
+from array import array
+from datetime import date
+from pydantic import BaseModel
+import faiss
+import numpy as np
+import threading
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Day number for documents without a usable date; never inside a date range
+NO_DATE = -1
+
+class SearchFilters(BaseModel):
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    categories: Optional[List[str]] = None
+    tickers: Optional[List[str]] = None
+
+    def is_empty(self) -> bool:
+        return not (self.start_date or self.end_date or self.categories or self.tickers)
+
+def parse_day(value: Any) -> int:
+    """Proleptic ordinal of an ISO date or timestamp string"""
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except (TypeError, ValueError):
+        return NO_DATE
+
+def document_tickers(metadata: Dict[str, Any]) -> List[str]:
+    tickers = metadata.get("tickers") or []
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    for key in ("ticker", "symbol"):
+        if metadata.get(key):
+            tickers = list(tickers) + [metadata[key]]
+    return [str(ticker).upper() for ticker in tickers]
+
+class MetadataIndex:
+    """Per-field doc id lists (categories, tickers) and a date column, used to pre-filter searches"""
+
+    def __init__(self):
+        self.categories: Dict[str, array] = {}
+        self.tickers: Dict[str, array] = {}
+        self.days = array("i")
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def add(self, metadata: Dict[str, Any]) -> int:
+        """Index a document's metadata under the next doc id"""
+        with self._lock:
+            doc_id = len(self.days)
+            category = metadata.get("category")
+            if category:
+                self.categories.setdefault(str(category).lower(), array("i")).append(doc_id)
+            for ticker in set(document_tickers(metadata)):
+                self.tickers.setdefault(ticker, array("i")).append(doc_id)
+            self.days.append(parse_day(metadata.get("date")))
+            return doc_id
+
+    def add_many(self, documents: List[Dict[str, Any]]):
+        for doc in documents:
+            self.add(doc.get('metadata') or {})
+
+    def compact(self, keep: np.ndarray) -> "MetadataIndex":
+        """New index over the documents where keep is true, renumbered in order.
+        Documents past the end of keep (appended since the mask was taken) are left out."""
+        size = len(keep)
+        new_ids = np.cumsum(keep, dtype=np.int64) - 1
+        compacted = MetadataIndex()
+        with self._lock:
+            for postings, target in ((self.categories, compacted.categories), (self.tickers, compacted.tickers)):
+                for key, ids in postings.items():
+                    ids = np.array(ids, dtype=np.int64)
+                    ids = ids[ids < size]
+                    ids = ids[keep[ids]]
+                    if len(ids):
+                        target[key] = array("i", new_ids[ids].astype(np.int32).tobytes())
+            compacted.days = array("i", np.array(self.days, dtype=np.int32)[:size][keep].tobytes())
+        return compacted
+
+    def truncate(self, size: int):
+        """Drop every document with id >= size, undoing a failed append"""
+        with self._lock:
+            for postings in (self.categories, self.tickers):
+                for key in list(postings):
+                    ids = postings[key]
+                    while ids and ids[-1] >= size:
+                        ids.pop()
+                    if not ids:
+                        del postings[key]
+            del self.days[size:]
+
+    def _union(self, postings: Dict[str, array], keys: List[str]) -> np.ndarray:
+        lists = [np.array(postings[key], dtype=np.int64) for key in keys if key in postings]
+        return np.unique(np.concatenate(lists)) if lists else np.empty(0, dtype=np.int64)
+
+    def select(self, filters: Optional[SearchFilters]) -> Optional[np.ndarray]:
+        """Sorted doc ids passing every filter, or None when nothing is filtered"""
+        if filters is None or filters.is_empty():
+            return None
+
+        with self._lock:
+            selected: Optional[np.ndarray] = None
+            if filters.categories:
+                selected = self._union(self.categories, [category.lower() for category in filters.categories])
+            if filters.tickers:
+                ids = self._union(self.tickers, [ticker.upper() for ticker in filters.tickers])
+                selected = ids if selected is None else np.intersect1d(selected, ids, assume_unique=True)
+            if filters.start_date or filters.end_date:
+                days = np.array(self.days, dtype=np.int32)
+                low = filters.start_date.toordinal() if filters.start_date else 0
+                high = filters.end_date.toordinal() if filters.end_date else np.iinfo(np.int32).max
+                if selected is None:
+                    selected = np.flatnonzero((days >= low) & (days <= high))
+                else:
+                    selected = selected[(days[selected] >= low) & (days[selected] <= high)]
+        return selected
+
+class IDSelector:
+    """FAISS selector over allowed doc ids; owns the arrays faiss only borrows"""
+
+    def __init__(self, ids: np.ndarray, ntotal: int):
+        ids = np.ascontiguousarray(ids, dtype=np.int64)
+        # A bitmap is one bit per vector; a batch selector hashes the ids. Pick the smaller.
+        if len(ids) * 64 > ntotal:
+            mask = np.zeros(ntotal, dtype=bool)
+            mask[ids[ids < ntotal]] = True
+            self._data = np.packbits(mask, bitorder="little")
+            self.selector = faiss.IDSelectorBitmap(ntotal, faiss.swig_ptr(self._data))
+        else:
+            self._data = ids
+            self.selector = faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(self._data))
@@ -0,0 +1,135 @@
+from typing import Dict, Any, List, Callable, Optional, Tuple
+import asyncio
+import time
+import os
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+QUERY_BATCH_MAX_WAIT_MS = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "5"))
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+class MicroBatcher:
+    """Collects concurrent async calls for a short window and runs them as one batch in a worker thread"""
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], Any],
+        max_batch_size: int = QUERY_BATCH_MAX_SIZE,
+        max_wait_ms: float = QUERY_BATCH_MAX_WAIT_MS,
+        name: str = "batcher"
+    ):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.batch_time = 0.0
+        self.histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.histogram_overflow = 0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = loop.create_task(self._run())
+            if self._pending:
+                self._wakeup.set()
+
+    async def submit(self, item: Any) -> Any:
+        """Result of fn for this item, computed together with whatever else arrives in the window"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._pending.append((item, future))
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            if len(self._pending) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_wait_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            if len(self._pending) < self.max_batch_size:
+                self._full.clear()
+            if not self._pending:
+                self._wakeup.clear()
+
+            # Callers that gave up while waiting are left out of the batch
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if batch:
+                await self._execute(batch)
+
+    async def _execute(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self._record(len(batch))
+        started = time.perf_counter()
+        try:
+            results = await asyncio.to_thread(self.fn, [item for item, _ in batch])
+            if len(results) != len(batch):
+                # zip would leave the callers past the shorter side waiting forever
+                raise ValueError(f"{self.name} returned {len(results)} results for {len(batch)} items")
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error running {self.name} batch: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.batch_time += time.perf_counter() - started
+
+    def close(self):
+        """Stop the worker task; pending callers are cancelled"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for _, future in self._pending:
+            future.cancel()
+        self._pending = []
+
+    def _record(self, size: int):
+        self.batches += 1
+        self.items += size
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self.histogram[bucket] += 1
+                return
+        self.histogram_overflow += 1
+
+    def stats(self) -> Dict[str, Any]:
+        histogram = {f"le_{bucket}": count for bucket, count in self.histogram.items()}
+        histogram["overflow"] = self.histogram_overflow
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "queued": len(self._pending),
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "mean_batch_ms": self.batch_time / self.batches * 1000 if self.batches else 0.0,
+            "batch_size_histogram": histogram
+        }
@@ -0,0 +1,232 @@
+from typing import Dict, Any, List, Optional, Set
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import os
+import time
+import logging
+
+from utils.http_cache import http_cache, article_store
+from utils.ingestion import chunk_text
+from utils.metadata_index import SearchFilters, parse_day
+from utils.retriever_agent import RetrieverAgent, retriever
+from utils.scraping_agent import NewsItem, fetch_news
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NEWS_FEED_SYMBOLS = [
+    symbol.strip().upper()
+    for symbol in os.getenv("NEWS_FEED_SYMBOLS", os.getenv("MARKET_WATCHLIST", "AAPL,GOOGL,MSFT,AMZN")).split(",")
+    if symbol.strip()
+]
+NEWS_FEED_INTERVAL = float(os.getenv("NEWS_FEED_INTERVAL", "900"))
+NEWS_FEED_BATCH_SIZE = int(os.getenv("NEWS_FEED_BATCH_SIZE", "64"))
+NEWS_RETENTION_DAYS = int(os.getenv("NEWS_RETENTION_DAYS", "30"))
+
+# Category the feed files its documents under; retention only applies to these
+NEWS_CATEGORY = "news"
+
+def article_hash(item: NewsItem) -> str:
+    """Hash of the article body, catching the same story syndicated under several URLs"""
+    body = " ".join((item.text or item.summary).split()).lower()
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+def news_documents(item: NewsItem, body_hash: str) -> List[Dict[str, Any]]:
+    """Retriever documents for one article, one per chunk of its text"""
+    chunks = chunk_text(item.text or item.summary) or [item.title]
+    documents = []
+    for position, chunk in enumerate(chunks):
+        metadata = {
+            "source": item.source,
+            "url": item.url,
+            "title": item.title,
+            "date": item.published_at.isoformat(),
+            "category": NEWS_CATEGORY,
+            "tickers": item.symbols,
+            "content_hash": body_hash,
+            "sentiment": item.sentiment,
+            "chunk": position
+        }
+        if position == 0:
+            metadata["summary"] = item.summary
+        # The title gives every chunk the context of the story it came from
+        documents.append({"text": f"{item.title}. {chunk}", "metadata": metadata})
+    return documents
+
+def is_news(doc: Dict[str, Any]) -> bool:
+    return (doc.get('metadata') or {}).get("category") == NEWS_CATEGORY
+
+class NewsFeed:
+    """Scrapes the watchlist's news on an interval and appends new articles to the retriever"""
+
+    def __init__(
+        self,
+        agent: RetrieverAgent = retriever,
+        symbols: List[str] = None,
+        interval: float = NEWS_FEED_INTERVAL,
+        retention_days: int = NEWS_RETENTION_DAYS,
+        batch_size: int = NEWS_FEED_BATCH_SIZE
+    ):
+        self.agent = agent
+        self.symbols = symbols or NEWS_FEED_SYMBOLS
+        self.interval = interval
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self._seen_urls: Optional[Set[str]] = None
+        self._seen_hashes: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.articles_indexed = 0
+        self.chunks_indexed = 0
+        self.duplicates = 0
+        self.expired = 0
+        self.last_run_at: Optional[str] = None
+        self.last_run_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _load_seen(self):
+        # Seed from the document store so a restart does not re-index what is already there
+        with self.agent._lock:
+            news = [doc['metadata'] for doc in self.agent.documents if is_news(doc)]
+        self._seen_urls = {metadata.get("url") for metadata in news}
+        self._seen_hashes = {metadata.get("content_hash") for metadata in news}
+
+    def ingest(self, items: List[NewsItem]) -> int:
+        """Dedupe, chunk, embed and append articles in batches; returns the number of new articles"""
+        if self._seen_urls is None:
+            self._load_seen()
+
+        documents = []
+        articles = 0
+        for item in items:
+            body_hash = article_hash(item)
+            if item.url in self._seen_urls or body_hash in self._seen_hashes:
+                self.duplicates += 1
+                continue
+            self._seen_urls.add(item.url)
+            self._seen_hashes.add(body_hash)
+            documents.extend(news_documents(item, body_hash))
+            articles += 1
+
+        try:
+            for start in range(0, len(documents), self.batch_size):
+                batch = documents[start:start + self.batch_size]
+                # Encoding happens outside the retriever lock; the lock is only held for the append
+                vectors = self.agent.encode([doc['text'] for doc in batch]) if self.agent.model else None
+                self.agent.add_documents(batch, vectors)
+        except Exception:
+            # Articles whose batch was rolled back are retried on the next run
+            self._load_seen()
+            raise
+
+        self.articles_indexed += articles
+        self.chunks_indexed += len(documents)
+        return articles
+
+    def expire(self, now: Optional[datetime] = None) -> int:
+        """Drop news older than the retention window; other documents are kept"""
+        cutoff = parse_day(((now or datetime.now()) - timedelta(days=self.retention_days)).date().isoformat())
+
+        def keep(doc: Dict[str, Any]) -> bool:
+            return not is_news(doc) or parse_day(doc['metadata'].get("date")) >= cutoff
+
+        removed = self.agent.prune_documents(keep)
+        if removed:
+            self._load_seen()
+        self.expired += removed
+        return removed
+
+    def _update(self, items: List[NewsItem]) -> int:
+        articles = self.ingest(items)
+        self.expire()
+        http_cache.prune()
+        article_store.prune()
+        # An exact index is swapped for the configured ANN type once the corpus allows it
+        self.agent.retrain_index()
+        self.agent.save_if_dirty()
+        return articles
+
+    async def run_once(self) -> int:
+        """Scrape the watchlist and index whatever is new"""
+        started = time.perf_counter()
+        try:
+            items = await fetch_news(self.symbols, days=self.retention_days)
+            articles = await asyncio.to_thread(self._update, items)
+            self.last_error = None
+            logger.info(f"News feed indexed {articles} new articles from {len(items)} scraped")
+            return articles
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Error updating news feed: {str(e)}")
+            return 0
+        finally:
+            self.runs += 1
+            self.last_run_at = datetime.now().isoformat()
+            self.last_run_seconds = time.perf_counter() - started
+
+    async def _run(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the periodic scrape-and-index loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"News feed started for {', '.join(self.symbols)} every {self.interval}s")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": self.symbols,
+            "runs": self.runs,
+            "articles_indexed": self.articles_indexed,
+            "chunks_indexed": self.chunks_indexed,
+            "duplicates": self.duplicates,
+            "expired": self.expired,
+            "retention_days": self.retention_days,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": self.last_run_seconds,
+            "last_error": self.last_error
+        }
+
+def recent_news(query: str = "", max_articles: int = 5, agent: RetrieverAgent = retriever) -> List[Dict[str, Any]]:
+    """Latest indexed articles, or the ones most relevant to query"""
+    if query:
+        hits = [doc for doc, _ in agent.search(
+            query, max_articles * 4, filters=SearchFilters(categories=[NEWS_CATEGORY])
+        )]
+    else:
+        with agent._lock:
+            hits = [doc for doc in agent.documents if is_news(doc) and doc['metadata'].get("chunk") == 0]
+        hits.sort(key=lambda doc: doc['metadata'].get("date") or "", reverse=True)
+
+    articles: Dict[str, Dict[str, Any]] = {}
+    for doc in hits:
+        metadata = doc['metadata']
+        if metadata.get("url") in articles:
+            continue
+        articles[metadata.get("url")] = {
+            "title": metadata.get("title", ""),
+            "source": metadata.get("source", ""),
+            "url": metadata.get("url", ""),
+            "summary": metadata.get("summary") or doc['text'],
+            "date": (metadata.get("date") or "")[:10],
+            "sentiment": metadata.get("sentiment", 0.0)
+        }
+        if len(articles) >= max_articles:
+            break
+    return list(articles.values())
+
+# Shared feed for the API's watchlist
+news_feed = NewsFeed()
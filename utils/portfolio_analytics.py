@@ -0,0 +1,176 @@
+from typing import Dict, Any, List, Optional, Sequence
+from statistics import NormalDist
+import numpy as np
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+
+class PortfolioAnalytics:
+    """Vectorized risk analytics over a symbols x time price matrix"""
+
+    def __init__(self, symbols: List[str], prices: np.ndarray, timestamps: Optional[np.ndarray] = None):
+        prices = np.asarray(prices, dtype=np.float64)
+        if prices.ndim != 2 or prices.shape[0] != len(symbols):
+            raise ValueError("prices must be a 2-D array with one row per symbol")
+        if prices.shape[1] < 2:
+            raise ValueError("at least two observations are required per symbol")
+
+        self.symbols = list(symbols)
+        self.prices = prices
+        self.timestamps = timestamps
+        self._returns: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_series(cls, series: Dict[str, Sequence[float]]) -> "PortfolioAnalytics":
+        """Build from equal-length price series keyed by symbol"""
+        symbols = list(series)
+        return cls(symbols, np.vstack([np.asarray(series[symbol], dtype=np.float64) for symbol in symbols]))
+
+    @classmethod
+    def from_price_store(cls, store, symbols: List[str], start=None, end=None) -> "PortfolioAnalytics":
+        """Build from the close prices of a PriceStore on the dates all symbols share"""
+        timestamps, prices = store.load_matrix(symbols, start, end)
+        return cls(symbols, prices, timestamps)
+
+    @property
+    def returns(self) -> np.ndarray:
+        """Simple period returns, shape (n_symbols, n_time - 1)"""
+        if self._returns is None:
+            self._returns = self.prices[:, 1:] / self.prices[:, :-1] - 1.0
+        return self._returns
+
+    @property
+    def log_returns(self) -> np.ndarray:
+        return np.log(self.prices[:, 1:] / self.prices[:, :-1])
+
+    def index_of(self, symbol: str) -> int:
+        return self.symbols.index(symbol)
+
+    def volatility(self, annualize: bool = False) -> np.ndarray:
+        """Per-symbol standard deviation of returns"""
+        vol = self.returns.std(axis=1, ddof=1)
+        return vol * np.sqrt(TRADING_DAYS_PER_YEAR) if annualize else vol
+
+    def rolling_volatility(self, window: int = 20, annualize: bool = False) -> np.ndarray:
+        """Rolling standard deviation of returns, shape (n_symbols, n_returns - window + 1)"""
+        returns = self.returns
+        if window < 2 or window > returns.shape[1]:
+            raise ValueError("window must be between 2 and the number of returns")
+
+        # Windowed sums from cumulative sums keep this O(n * t) for any window
+        zeros = np.zeros((returns.shape[0], 1))
+        csum = np.concatenate([zeros, np.cumsum(returns, axis=1)], axis=1)
+        csum_sq = np.concatenate([zeros, np.cumsum(returns * returns, axis=1)], axis=1)
+        sums = csum[:, window:] - csum[:, :-window]
+        sums_sq = csum_sq[:, window:] - csum_sq[:, :-window]
+        variance = (sums_sq - sums * sums / window) / (window - 1)
+        vol = np.sqrt(np.clip(variance, 0.0, None))
+        return vol * np.sqrt(TRADING_DAYS_PER_YEAR) if annualize else vol
+
+    def beta(self, benchmark_returns: np.ndarray) -> np.ndarray:
+        """Per-symbol beta against a benchmark return series aligned with the price matrix"""
+        benchmark = np.asarray(benchmark_returns, dtype=np.float64)
+        if benchmark.shape[0] != self.returns.shape[1]:
+            raise ValueError("benchmark returns must align with the price matrix")
+
+        demeaned = self.returns - self.returns.mean(axis=1, keepdims=True)
+        bench_demeaned = benchmark - benchmark.mean()
+        bench_var = bench_demeaned @ bench_demeaned
+        if bench_var == 0:
+            return np.zeros(len(self.symbols))
+        return (demeaned @ bench_demeaned) / bench_var
+
+    def beta_to(self, benchmark_symbol: str) -> np.ndarray:
+        """Per-symbol beta against one of the symbols in the matrix"""
+        return self.beta(self.returns[self.index_of(benchmark_symbol)])
+
+    def covariance(self, annualize: bool = False) -> np.ndarray:
+        cov = np.cov(self.returns)
+        return cov * TRADING_DAYS_PER_YEAR if annualize else cov
+
+    def correlation(self) -> np.ndarray:
+        return np.corrcoef(self.returns)
+
+    def drawdown(self) -> np.ndarray:
+        """Drawdown from the running peak at every point, shape (n_symbols, n_time)"""
+        peaks = np.maximum.accumulate(self.prices, axis=1)
+        return self.prices / peaks - 1.0
+
+    def max_drawdown(self) -> np.ndarray:
+        return self.drawdown().min(axis=1)
+
+    def value_at_risk(self, confidence: float = 0.95, method: str = "historical") -> np.ndarray:
+        """Per-symbol one-period VaR as a positive fraction of value"""
+        if method == "historical":
+            return -np.quantile(self.returns, 1.0 - confidence, axis=1)
+        if method == "parametric":
+            z = NormalDist().inv_cdf(1.0 - confidence)
+            return -(self.returns.mean(axis=1) + z * self.returns.std(axis=1, ddof=1))
+        raise ValueError(f"Unknown VaR method: {method}")
+
+    def _weights(self, weights: Optional[Sequence[float]]) -> np.ndarray:
+        if weights is None:
+            return np.full(len(self.symbols), 1.0 / len(self.symbols))
+        weights = np.asarray(weights, dtype=np.float64)
+        return weights / weights.sum()
+
+    def portfolio_returns(self, weights: Optional[Sequence[float]] = None) -> np.ndarray:
+        """Return series of a constant-weight portfolio, equal weighted by default"""
+        return self._weights(weights) @ self.returns
+
+    def portfolio_value_at_risk(
+        self,
+        weights: Optional[Sequence[float]] = None,
+        confidence: float = 0.95
+    ) -> float:
+        return float(-np.quantile(self.portfolio_returns(weights), 1.0 - confidence))
+
+    def risk_summary(
+        self,
+        benchmark_returns: Optional[np.ndarray] = None,
+        weights: Optional[Sequence[float]] = None,
+        confidence: float = 0.95
+    ) -> Dict[str, Any]:
+        """Portfolio-level figures in the units determine_risk_level/determine_sentiment expect"""
+        weights = self._weights(weights)
+        portfolio = self.portfolio_returns(weights)
+        value = np.cumprod(1.0 + portfolio)
+        drawdown = value / np.maximum.accumulate(np.maximum(value, 1.0)) - 1.0
+
+        # Volatility and change are daily percentages, beta is dimensionless
+        return {
+            "volatility": float(portfolio.std(ddof=1) * 100),
+            "beta": float(weights @ self.beta(benchmark_returns)) if benchmark_returns is not None else 1.0,
+            "weighted_change": float(portfolio[-1] * 100),
+            "value_at_risk": self.portfolio_value_at_risk(weights, confidence) * 100,
+            "max_drawdown": float(drawdown.min() * 100)
+        }
+
+def risk_summary_from_store(
+    store,
+    symbols: List[str],
+    benchmark: str,
+    start=None,
+    end=None
+) -> Optional[Dict[str, Any]]:
+    """Portfolio risk summary from stored history, or None when there is not enough of it"""
+    symbols = [symbol for symbol in symbols if store.has(symbol)]
+    if not symbols or not store.has(benchmark):
+        return None
+
+    timestamps, prices = store.load_matrix(symbols + [benchmark], start, end)
+    if prices.shape[1] < 3:
+        return None
+
+    analytics = PortfolioAnalytics(symbols, prices[:-1], timestamps)
+    benchmark_prices = prices[-1]
+    benchmark_returns = benchmark_prices[1:] / benchmark_prices[:-1] - 1.0
+    summary = analytics.risk_summary(benchmark_returns)
+    summary["symbols"] = symbols
+    summary["benchmark"] = benchmark
+    summary["observations"] = int(prices.shape[1])
+    return summary
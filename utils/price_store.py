@@ -0,0 +1,272 @@
+from typing import Dict, Any, List, Optional, Tuple, Union
+from datetime import datetime, date, timezone
+import numpy as np
+import pandas as pd
+import asyncio
+import threading
+import os
+import logging
+
+from utils.api_agent import alpha_vantage_get, yfinance_download, _get_api_key
+from utils.rate_limiter import PRIORITY_BACKGROUND
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", "data/price_store")
+HISTORY_SYNC_INTERVAL = float(os.getenv("HISTORY_SYNC_INTERVAL", "86400"))
+# Stored bars re-fetched on every sync: the last one may have been written mid-session,
+# and vendors revise recent bars after the close
+HISTORY_SYNC_OVERLAP = int(os.getenv("HISTORY_SYNC_OVERLAP", "5"))
+# Relative close change on an older bar that means the history was split/dividend adjusted
+ADJUSTMENT_TOLERANCE = float(os.getenv("ADJUSTMENT_TOLERANCE", "1e-4"))
+
+# One fixed-width record per bar; files are raw arrays of these so they can be
+# appended to in place and memory-mapped without any parsing
+BAR_DTYPE = np.dtype([
+    ("ts", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8")
+])
+
+TimeLike = Union[int, str, date, datetime, None]
+
+def to_timestamp(value: TimeLike) -> Optional[int]:
+    """Convert a date-like value to epoch seconds (UTC)"""
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+def frame_to_bars(frame: pd.DataFrame) -> np.ndarray:
+    """Convert an OHLCV DataFrame indexed by date into bar records"""
+    frame = frame.dropna(subset=["Close"])
+    bars = np.empty(len(frame), dtype=BAR_DTYPE)
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    bars["ts"] = (index.normalize() - pd.Timestamp("1970-01-01")) // pd.Timedelta(seconds=1)
+    for field, column in (("open", "Open"), ("high", "High"), ("low", "Low"), ("close", "Close"), ("volume", "Volume")):
+        bars[field] = frame[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    return bars
+
+class PriceStore:
+    """OHLCV bar files per symbol, appended to in place and read through memory maps"""
+
+    def __init__(self, root: str = PRICE_STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._maps: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.root, f"{symbol.upper()}.bars")
+
+    def symbols(self) -> List[str]:
+        return sorted(name[:-5] for name in os.listdir(self.root) if name.endswith(".bars"))
+
+    def has(self, symbol: str) -> bool:
+        return len(self.bars(symbol)) > 0
+
+    def bars(self, symbol: str) -> np.ndarray:
+        """Return all bars for a symbol as a read-only memory map"""
+        symbol = symbol.upper()
+        with self._lock:
+            bars = self._maps.get(symbol)
+            if bars is None:
+                path = self._path(symbol)
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                count = size // BAR_DTYPE.itemsize
+                if count == 0:
+                    return np.empty(0, dtype=BAR_DTYPE)
+                bars = np.memmap(path, dtype=BAR_DTYPE, mode="r", shape=(count,))
+                self._maps[symbol] = bars
+            return bars
+
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        bars = self.bars(symbol)
+        return int(bars["ts"][-1]) if len(bars) else None
+
+    def append(self, symbol: str, bars: np.ndarray) -> int:
+        """Write bars, overwriting stored ones with the same timestamp; returns how many were written"""
+        symbol = symbol.upper()
+        bars = np.sort(np.asarray(bars, dtype=BAR_DTYPE), order="ts")
+        if len(bars) == 0:
+            return 0
+
+        # Drop duplicate timestamps within the batch, keeping the latest bar
+        keep = np.append(bars["ts"][1:] != bars["ts"][:-1], True)
+        bars = bars[keep]
+
+        stored = self.bars(symbol)
+        position = int(np.searchsorted(stored["ts"], bars["ts"][0], side="left"))
+        if position < len(stored):
+            # Rewrite the tail from the first overlapping bar. Every stored bar there is either
+            # replaced or kept, so the file never shrinks under readers still mapping it.
+            tail = np.asarray(stored[position:])
+            bars = np.sort(np.concatenate([bars, tail[~np.isin(tail["ts"], bars["ts"])]]), order="ts")
+
+        with self._lock:
+            with open(self._path(symbol), "r+b" if position < len(stored) else "ab") as f:
+                f.seek(position * BAR_DTYPE.itemsize)
+                f.write(bars.tobytes())
+            # Remap on next read so the new bars become visible
+            self._maps.pop(symbol, None)
+        return len(bars)
+
+    def replace(self, symbol: str, bars: np.ndarray) -> int:
+        """Swap in a full history, e.g. after a split or dividend re-adjusted every past bar"""
+        symbol = symbol.upper()
+        bars = np.sort(np.asarray(bars, dtype=BAR_DTYPE), order="ts")
+        keep = np.append(bars["ts"][1:] != bars["ts"][:-1], True) if len(bars) else np.empty(0, dtype=bool)
+        bars = bars[keep]
+
+        path = self._path(symbol)
+        with self._lock:
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(bars.tobytes())
+            # Readers holding the old map keep the old file until they let go of it
+            os.replace(f"{path}.tmp", path)
+            self._maps.pop(symbol, None)
+        return len(bars)
+
+    def is_adjusted(self, symbol: str, bars: np.ndarray) -> bool:
+        """Whether fetched bars disagree with stored closes, meaning the history was re-adjusted"""
+        stored = self.bars(symbol)
+        # The newest stored bar may be a partial session, so only settled bars are compared
+        settled = stored[:-1]
+        shared, stored_at, fetched_at = np.intersect1d(settled["ts"], bars["ts"], return_indices=True)
+        if len(shared) == 0:
+            return False
+        old = settled["close"][stored_at]
+        new = bars["close"][fetched_at]
+        return bool(np.any(np.abs(new - old) > ADJUSTMENT_TOLERANCE * np.abs(old)))
+
+    def sync_start(self, symbol: str, overlap: int = HISTORY_SYNC_OVERLAP) -> Optional[date]:
+        """First day to re-fetch so the last overlap stored bars are refreshed"""
+        bars = self.bars(symbol)
+        if len(bars) == 0:
+            return None
+        return datetime.fromtimestamp(int(bars["ts"][-min(overlap, len(bars))]), tz=timezone.utc).date()
+
+    def read_range(self, symbol: str, start: TimeLike = None, end: TimeLike = None) -> np.ndarray:
+        """Return bars in [start, end] as a zero-copy slice of the memory map"""
+        bars = self.bars(symbol)
+        timestamps = bars["ts"]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, to_timestamp(start), side="left"))
+        hi = len(bars) if end is None else int(np.searchsorted(timestamps, to_timestamp(end), side="right"))
+        return bars[lo:hi]
+
+    def load_matrix(
+        self,
+        symbols: List[str],
+        start: TimeLike = None,
+        end: TimeLike = None,
+        field: str = "close"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (timestamps, symbols x time matrix) on the dates all symbols share"""
+        ranges = [self.read_range(symbol, start, end) for symbol in symbols]
+        if not ranges or any(len(r) == 0 for r in ranges):
+            return np.empty(0, dtype=np.int64), np.empty((len(symbols), 0))
+
+        common = ranges[0]["ts"]
+        for r in ranges[1:]:
+            common = np.intersect1d(common, r["ts"], assume_unique=True)
+
+        matrix = np.empty((len(symbols), len(common)))
+        for row, r in enumerate(ranges):
+            matrix[row] = r[field][np.searchsorted(r["ts"], common)]
+        return np.asarray(common), matrix
+
+    def _fetch_yfinance(self, symbols: List[str], window: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        frame = yfinance_download(symbols, interval="1d", group_by="ticker", threads=True, progress=False, **window)
+        fetched = {}
+        if frame is None or frame.empty:
+            return fetched
+        for symbol in symbols:
+            if isinstance(frame.columns, pd.MultiIndex):
+                if symbol not in frame.columns.get_level_values(0):
+                    continue
+                symbol_frame = frame[symbol]
+            elif len(symbols) == 1:
+                symbol_frame = frame
+            else:
+                continue
+            fetched[symbol] = frame_to_bars(symbol_frame)
+        return fetched
+
+    def _download_yfinance(self, symbols: List[str]) -> Dict[str, int]:
+        # Everything for new symbols; for known ones the tail plus a few stored bars, which
+        # are overwritten and double as a check for split/dividend re-adjustments
+        written = {}
+        new_symbols = [symbol for symbol in symbols if self.last_timestamp(symbol) is None]
+        known_symbols = [symbol for symbol in symbols if symbol not in new_symbols]
+        full = list(new_symbols)
+        if known_symbols:
+            start = min(self.sync_start(symbol) for symbol in known_symbols)
+            for symbol, bars in self._fetch_yfinance(known_symbols, {"start": start.isoformat()}).items():
+                if self.is_adjusted(symbol, bars):
+                    logger.info(f"History for {symbol} was re-adjusted upstream, downloading it again")
+                    full.append(symbol)
+                else:
+                    written[symbol] = self.append(symbol, bars)
+
+        if full:
+            for symbol, bars in self._fetch_yfinance(full, {"period": "max"}).items():
+                written[symbol] = self.replace(symbol, bars) if symbol in known_symbols else self.append(symbol, bars)
+        return written
+
+    async def update_from_yfinance(self, symbols: List[str]) -> Dict[str, int]:
+        """Incrementally sync daily bars from yfinance without blocking the event loop"""
+        symbols = [symbol.upper() for symbol in symbols]
+        return await asyncio.to_thread(self._download_yfinance, symbols)
+
+    async def update_from_alpha_vantage(self, symbol: str) -> int:
+        """Incrementally sync daily bars from Alpha Vantage TIME_SERIES_DAILY"""
+        symbol = symbol.upper()
+        params = {
+            "function": "TIME_SERIES_DAILY",
+            "symbol": symbol,
+            "outputsize": "full" if self.last_timestamp(symbol) is None else "compact",
+            "apikey": _get_api_key()
+        }
+        payload = await alpha_vantage_get(params, PRIORITY_BACKGROUND)
+        series = payload.get("Time Series (Daily)", {})
+        if not series:
+            return 0
+
+        frame = pd.DataFrame.from_dict(series, orient="index").astype(float)
+        frame.index = pd.to_datetime(frame.index)
+        frame.columns = [column.split(". ", 1)[-1].capitalize() for column in frame.columns]
+        # compact covers the last 100 bars, so recent stored bars are overwritten with the revised ones
+        return await asyncio.to_thread(self.append, symbol, frame_to_bars(frame))
+
+    async def run_sync(self, symbols: List[str], interval: float = HISTORY_SYNC_INTERVAL):
+        """Keep history for the given symbols current, syncing every interval seconds"""
+        while True:
+            try:
+                written = await self.update_from_yfinance(symbols)
+                logger.info(f"History sync wrote {sum(written.values())} bars for {len(written)} symbols")
+            except Exception as e:
+                logger.warning(f"Error syncing price history: {str(e)}")
+            await asyncio.sleep(interval)
+
+# Shared price store
+price_store = PriceStore()
+
+if __name__ == "__main__":
+    import sys
+
+    # Backfill or top up history: python -m utils.price_store AAPL MSFT SPY
+    result = asyncio.run(price_store.update_from_yfinance(sys.argv[1:]))
+    for symbol, count in result.items():
+        print(f"{symbol}: wrote {count} bars, {len(price_store.bars(symbol))} total")
@@ -0,0 +1,116 @@
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import asyncio
+import os
+import time
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUOTE_CACHE_TTL = float(os.getenv("QUOTE_CACHE_TTL", "60"))
+QUOTE_CACHE_MAX_ENTRIES = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "1000"))
+
+@dataclass
+class CacheEntry:
+    value: Dict[str, Any]
+    fetched_at: float
+
+class QuoteCache:
+    """In-process TTL cache for quotes with single-flight loading"""
+
+    def __init__(self, ttl: float = QUOTE_CACHE_TTL, max_entries: int = QUOTE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        # symbol -> (future, priority) of the upstream call in flight
+        self._inflight: Dict[str, Tuple[asyncio.Future, int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _is_fresh(self, entry: CacheEntry) -> bool:
+        return time.monotonic() - entry.fetched_at < self.ttl
+
+    def get_entry(self, symbol: str) -> Optional[CacheEntry]:
+        """Return the cached entry for a symbol regardless of age"""
+        return self._entries.get(symbol)
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh cached quote or None"""
+        entry = self._entries.get(symbol)
+        if entry is None or not self._is_fresh(entry):
+            return None
+        self._entries.move_to_end(symbol)
+        return entry.value
+
+    def set(self, symbol: str, value: Dict[str, Any]):
+        """Store a quote, evicting the least recently used entries when full"""
+        self._entries[symbol] = CacheEntry(value=value, fetched_at=time.monotonic())
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(
+        self,
+        symbol: str,
+        loader: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+        force_refresh: bool = False,
+        priority: int = 0
+    ) -> Optional[Dict[str, Any]]:
+        """Return a cached quote or load it, collapsing concurrent misses into one call"""
+        if not force_refresh:
+            value = self.get(symbol)
+            if value is not None:
+                self.hits += 1
+                return value
+
+        # Join an upstream call that is already in flight for this symbol, unless it was
+        # queued in a less urgent lane (lower priority values are served first)
+        inflight = self._inflight.get(symbol)
+        if inflight is not None and inflight[1] <= priority:
+            self.coalesced += 1
+            return await asyncio.shield(inflight[0])
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[symbol] = (future, priority)
+        try:
+            value = await loader(symbol)
+            if value is not None:
+                self.set(symbol, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure is not reported as never retrieved
+            future.exception()
+            raise
+        finally:
+            # A more urgent load may have taken over the slot meanwhile
+            if self._inflight.get(symbol, (None, 0))[0] is future:
+                del self._inflight[symbol]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/coalesced counters for sizing the TTL"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0
+        }
+
+# Shared quote cache used by the market data fetcher
+quote_cache = QuoteCache()
@@ -0,0 +1,146 @@
+from typing import Dict, Any, List, Optional
+import asyncio
+import heapq
+import itertools
+import time
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Priority lanes, lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+LANE_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+class RateLimitExceeded(Exception):
+    """Raised when the upstream API reports that its rate limit was hit"""
+
+class DailyQuotaExceeded(RateLimitExceeded):
+    """Raised without waiting while the upstream daily quota is used up"""
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate"""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_available(self, now: float) -> float:
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class RateLimiter:
+    """Async token-bucket limiter with per-minute and per-day quotas and priority lanes"""
+
+    def __init__(self, calls_per_minute: float, calls_per_day: float, name: str = "limiter"):
+        self.name = name
+        self.calls_per_minute = calls_per_minute
+        self.calls_per_day = calls_per_day
+        self._buckets = [
+            TokenBucket(calls_per_minute / 60.0, calls_per_minute),
+            TokenBucket(calls_per_day / 86400.0, calls_per_day)
+        ]
+        self._waiters: List[tuple] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self._exhausted_until = 0.0
+        self.granted = 0
+        self.backoffs = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        """Wait for a token, queueing behind callers with the same or higher priority"""
+        if time.monotonic() < self._exhausted_until:
+            raise DailyQuotaExceeded(f"{self.name}: daily quota exhausted")
+        future = asyncio.get_running_loop().create_future()
+        enqueued_at = time.monotonic()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+        waited = time.monotonic() - enqueued_at
+        self.granted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    async def _dispatch(self):
+        while self._waiters:
+            # Skip callers that gave up while queued
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+                continue
+
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            wait = max(bucket.time_until_available(now) for bucket in self._buckets)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            for bucket in self._buckets:
+                bucket.tokens -= 1
+            _, _, future = heapq.heappop(self._waiters)
+            future.set_result(None)
+
+    def backoff(self, seconds: float):
+        """Pause all grants for the given number of seconds"""
+        self.backoffs += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"{self.name}: upstream rate limit hit, backing off for {seconds:.1f}s")
+
+    def exhaust_daily(self, seconds: float):
+        """Fail calls fast until the daily quota resets, including the ones already queued"""
+        self._exhausted_until = max(self._exhausted_until, time.monotonic() + seconds)
+        self._buckets[1].tokens = 0
+        for _, _, future in self._waiters:
+            if not future.done():
+                future.set_exception(DailyQuotaExceeded(f"{self.name}: daily quota exhausted"))
+        self._waiters = []
+        logger.warning(f"{self.name}: daily quota exhausted, failing calls for {seconds / 3600:.1f}h")
+
+    def queue_depth(self) -> Dict[str, int]:
+        depth = {name: 0 for name in LANE_NAMES.values()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                lane = LANE_NAMES.get(priority, str(priority))
+                depth[lane] = depth.get(lane, 0) + 1
+        return depth
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        for bucket in self._buckets:
+            bucket.refill(now)
+        return {
+            "calls_per_minute": self.calls_per_minute,
+            "calls_per_day": self.calls_per_day,
+            "queue_depth": self.queue_depth(),
+            "granted": self.granted,
+            "avg_wait_seconds": self.total_wait / self.granted if self.granted else 0.0,
+            "max_wait_seconds": self.max_wait,
+            "backoffs": self.backoffs,
+            "backoff_remaining_seconds": max(0.0, self._paused_until - now),
+            "daily_quota_exhausted_seconds": max(0.0, self._exhausted_until - now),
+            "minute_tokens": round(self._buckets[0].tokens, 3),
+            "day_tokens": round(self._buckets[1].tokens, 3)
+        }
@@ -0,0 +1,173 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+import numpy as np
+import hashlib
+import threading
+import json
+import os
+import time
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "900"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")
+
+@dataclass
+class CachedResponse:
+    query: str
+    response: str
+    confidence: float
+    sources: List[Any]
+    context_hash: str
+    created_at: float
+
+def context_hash(*parts: str) -> str:
+    """Hash the market snapshot and retrieved context an answer was generated from"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class SemanticResponseCache:
+    """LRU + TTL cache of LLM answers matched on query embedding similarity"""
+
+    def __init__(
+        self,
+        threshold: float = RESPONSE_CACHE_THRESHOLD,
+        ttl: float = RESPONSE_CACHE_TTL,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        path: Optional[str] = RESPONSE_CACHE_PATH or None
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self._entries: "OrderedDict[int, CachedResponse]" = OrderedDict()
+        self._vectors: Dict[int, np.ndarray] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        if path:
+            self.load()
+
+    @staticmethod
+    def normalize(vector: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Unit-normalize an embedding computed elsewhere, e.g. by the batched query encoder"""
+        if vector is None:
+            return None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.ttl
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry.created_at < cutoff]
+        for entry_id in expired:
+            del self._entries[entry_id]
+            del self._vectors[entry_id]
+
+    def lookup(self, vector: Optional[np.ndarray], context: str) -> Optional[Tuple[CachedResponse, float]]:
+        """Return the most similar cached answer for the same context, if similar enough"""
+        if vector is None:
+            self.bypassed += 1
+            return None
+
+        with self._lock:
+            self._evict_expired()
+            candidates = [entry_id for entry_id, entry in self._entries.items() if entry.context_hash == context]
+            if candidates:
+                similarities = np.stack([self._vectors[entry_id] for entry_id in candidates]) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id], float(similarities[best])
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        vector: Optional[np.ndarray],
+        query: str,
+        context: str,
+        response: str,
+        confidence: float,
+        sources: List[Any]
+    ):
+        """Cache an answer for the given query embedding and context"""
+        if vector is None:
+            return
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = CachedResponse(
+                query=query,
+                response=response,
+                confidence=confidence,
+                sources=sources,
+                context_hash=context,
+                created_at=time.time()
+            )
+            self._vectors[entry_id] = vector
+            while len(self._entries) > self.max_entries:
+                evicted_id, _ = self._entries.popitem(last=False)
+                del self._vectors[evicted_id]
+
+    def save(self):
+        """Persist entries and vectors so the cache survives restarts"""
+        if not self.path:
+            return
+        with self._lock:
+            self._evict_expired()
+            ids = list(self._entries)
+            entries = [asdict(self._entries[entry_id]) for entry_id in ids]
+            vectors = np.stack([self._vectors[entry_id] for entry_id in ids]) if ids else np.empty((0, 0), dtype=np.float32)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, vectors=vectors, entries=np.array(json.dumps(entries)))
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Restore entries saved by save(), dropping ones that have expired"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                vectors = data["vectors"]
+                entries = json.loads(str(data["entries"]))
+            with self._lock:
+                for entry, vector in zip(entries, vectors):
+                    self._entries[self._next_id] = CachedResponse(**entry)
+                    self._vectors[self._next_id] = vector
+                    self._next_id += 1
+                self._evict_expired()
+            logger.info(f"Restored {len(self._entries)} cached responses")
+        except Exception as e:
+            logger.warning(f"Failed to load response cache: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+# Shared response cache, keyed on the query vectors the retriever's batched encoder produces
+response_cache = SemanticResponseCache()
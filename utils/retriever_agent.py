@@ -1,138 +1,617 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import faiss
 import numpy as np
 import json
 import os
+import asyncio
+import hashlib
+import threading
 import logging
 from datetime import datetime
 from dataclasses import dataclass
-from sentence_transformers import SentenceTransformer
-import torch
+
+from utils.bm25_index import BM25Index
+from utils.embedding_backend import load_embedding_model, embedding_model_id
+from utils.embedding_cache import EmbeddingCache
+from utils.micro_batcher import MicroBatcher
+from utils.metadata_index import MetadataIndex, SearchFilters, IDSelector
+from utils.hybrid_search import CrossEncoderReranker, reciprocal_rank_fusion, RERANK_ENABLED
+from utils.vector_index import IndexConfig, build_index, search_params, apply_search_defaults
+from utils.vector_index import create_index as create_vector_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Force CPU usage
+# Force CPU usage; thread count is set by EMBEDDING_THREADS in utils.embedding_backend
 os.environ["CUDA_VISIBLE_DEVICES"] = ""
-torch.set_num_threads(4)  # Limit CPU threads
 
-# Initialize global variables
-index = None
-documents = []
-model = None
+# Retriever configuration
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "vector_store")
+FALLBACK_DOCS_PATH = os.getenv("FALLBACK_DOCS_PATH", "data/fallback_docs.json")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+# Filters matching at most this many documents are searched exactly
+FILTER_EXACT_MAX = int(os.getenv("FILTER_EXACT_MAX", "2048"))
+# Query vectors are kept in memory only; free-form questions would bloat the persistent cache
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+# Keyword search runs here while the calling thread does the vector search
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="search")
 
 @dataclass
 class SearchResult:
     text: str
     metadata: Dict[str, Any]
+    score: float = 0.0
 
 @dataclass
 class SearchResults:
     results: List[SearchResult]
 
+def corpus_hash(documents: List[Dict[str, Any]], model_name: str) -> str:
+    """Content hash of the corpus and the model used to embed it"""
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    for doc in documents:
+        digest.update(json.dumps(doc, sort_keys=True).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+def is_mmapped(index: faiss.Index) -> bool:
+    """Whether the index reads its vectors from a memory map rather than from RAM"""
+    if not isinstance(index, faiss.IndexIVF):
+        return False
+    return isinstance(faiss.downcast_InvertedLists(index.invlists), faiss.OnDiskInvertedLists)
+
 class RetrieverAgent:
-    def __init__(self):
+    def __init__(self, store_dir: str = VECTOR_STORE_DIR, index_config: Optional[IndexConfig] = None):
         self.model = None
+        self.model_id = EMBEDDING_MODEL
         self.index = None
         self.documents = []
+        self.store_dir = store_dir
+        self.index_config = index_config or IndexConfig.from_env()
+        self.embedding_cache = None
+        self._query_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_lock = threading.Lock()
+        self.bm25 = BM25Index()
+        self.metadata_index = MetadataIndex()
+        self.reranker = CrossEncoderReranker()
+        self._index_mmapped = False
+        self._dirty = False
+        self._lock = threading.RLock()
         self.initialize()
 
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.store_dir, "index.faiss")
+
+    @property
+    def documents_path(self) -> str:
+        return os.path.join(self.store_dir, "documents.json")
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.store_dir, "manifest.json")
+
+    @property
+    def bm25_path(self) -> str:
+        return os.path.join(self.store_dir, "bm25.npz")
+
     def initialize(self):
         """Initialize the retriever with fallback options"""
         try:
             # Try to load the model with CPU explicitly
-            self.model = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')
+            self.model, backend = load_embedding_model(EMBEDDING_MODEL)
+            self.model_id = embedding_model_id(EMBEDDING_MODEL, backend)
+            with self._query_lock:
+                self._query_vectors.clear()
             logger.info("Successfully loaded SentenceTransformer model on CPU")
         except Exception as e:
             logger.warning(f"Failed to load SentenceTransformer model: {str(e)}")
             logger.info("Using fallback document search functionality")
             self.model = None
 
-        # Load fallback documents
+        if self.model:
+            try:
+                cache_path = EMBEDDING_CACHE_PATH or os.path.join(self.store_dir, "embeddings.sqlite")
+                self.embedding_cache = EmbeddingCache(cache_path, self.model_id)
+            except Exception as e:
+                logger.warning(f"Embedding cache unavailable: {str(e)}")
+
+        # The persisted document store wins over the bundled fallback documents
+        self.documents = self._load_documents()
+        self.load_keyword_index()
+
+        if self.model:
+            try:
+                self.load_index()
+            except Exception as e:
+                logger.error(f"Error loading vector index: {str(e)}")
+                self.index = None
+
+    def _load_documents(self) -> List[Dict[str, Any]]:
+        for path in (self.documents_path, FALLBACK_DOCS_PATH):
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r') as f:
+                        return json.load(f)
+                except Exception as e:
+                    logger.warning(f"Failed to load documents from {path}: {str(e)}")
+        return []
+
+    def encode(self, texts: List[str], encoder: Optional[Callable[[List[str]], Any]] = None) -> np.ndarray:
+        """Embed texts through the embedding cache so unchanged text is never re-encoded"""
+        encoder = encoder or self.model.encode
+        if self.embedding_cache is None:
+            return np.asarray(encoder(texts), dtype='float32')
+        return self.embedding_cache.encode(texts, encoder)
+
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed queries through a bounded in-memory LRU, bypassing the persistent embedding cache"""
+        with self._query_lock:
+            found = {}
+            for query in queries:
+                if query in self._query_vectors:
+                    self._query_vectors.move_to_end(query)
+                    found[query] = self._query_vectors[query]
+        missing = list(dict.fromkeys(query for query in queries if query not in found))
+        if missing:
+            vectors = np.asarray(self.model.encode(missing), dtype='float32')
+            found.update(zip(missing, vectors))
+            with self._query_lock:
+                self._query_vectors.update(zip(missing, vectors))
+                while len(self._query_vectors) > QUERY_EMBEDDING_CACHE_SIZE:
+                    self._query_vectors.popitem(last=False)
+        return np.stack([found[query] for query in queries])
+
+    def load_keyword_index(self):
+        """Load the persisted BM25 index for this corpus, or build it from the documents"""
+        bm25 = BM25Index.load(self.bm25_path, corpus_hash(self.documents, self.model_id))
+        if bm25 is None or len(bm25) != len(self.documents):
+            bm25 = BM25Index()
+            bm25.add_many([doc['text'] for doc in self.documents])
+        # Metadata postings are cheap to rebuild, so they are not persisted
+        metadata_index = MetadataIndex()
+        metadata_index.add_many(self.documents)
+        with self._lock:
+            self.bm25 = bm25
+            self.metadata_index = metadata_index
+
+    def _read_manifest(self) -> Dict[str, Any]:
         try:
-            with open('data/fallback_docs.json', 'r') as f:
-                self.documents = json.load(f)
-        except Exception as e:
-            logger.warning(f"Failed to load fallback documents: {str(e)}")
-            self.documents = []
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except Exception:
+            return {}
 
-    def search_documents(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        """Search documents with fallback to keyword matching"""
+    def load_index(self):
+        """Load the persisted index if it matches the corpus, otherwise rebuild and persist it"""
+        expected_hash = corpus_hash(self.documents, self.model_id)
+        manifest = self._read_manifest()
+
+        # A change of index type or build parameters also forces a rebuild
+        if (
+            manifest.get("corpus_hash") == expected_hash
+            and manifest.get("index") == self.index_config.build_params()
+            and os.path.exists(self.index_path)
+        ):
+            try:
+                # Only IVF inverted lists are memory-mapped; flat and HNSW indexes are
+                # still read into memory in full
+                index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP)
+            except Exception:
+                index = faiss.read_index(self.index_path)
+            mmapped = is_mmapped(index)
+
+            if index.ntotal == len(self.documents):
+                apply_search_defaults(index, self.index_config)
+                with self._lock:
+                    self.index = index
+                    self._index_mmapped = mmapped
+                logger.info(
+                    f"Loaded persisted vector index with {index.ntotal} documents"
+                    f"{' (inverted lists memory-mapped)' if mmapped else ''}"
+                )
+                return
+            logger.warning("Persisted vector index does not match the document store, rebuilding")
+
+        self.rebuild_index()
+
+    def rebuild_index(self, documents: Optional[List[Dict[str, Any]]] = None):
+        """Embed the whole corpus, build a fresh index and persist it"""
         if not self.model:
-            # Fallback to simple keyword matching
-            return self._keyword_search(query, top_k)
+            raise Exception("SentenceTransformer model not loaded")
 
-        try:
-            # Encode query
-            query_vector = self.model.encode([query])[0]
-            
-            # Create FAISS index if not exists
-            if self.index is None:
-                dimension = query_vector.shape[0]
-                self.index = faiss.IndexFlatL2(dimension)
-                if self.documents:
-                    doc_vectors = self.model.encode([doc['text'] for doc in self.documents])
-                    self.index.add(np.array(doc_vectors).astype('float32'))
-
-            # Search
-            distances, indices = self.index.search(
-                np.array([query_vector]).astype('float32'), 
-                min(top_k, len(self.documents))
+        documents = self.documents if documents is None else documents
+        dimension = self.model.get_sentence_embedding_dimension()
+        doc_vectors = self.encode([doc['text'] for doc in documents]) if documents else np.empty((0, dimension))
+        index = build_index(doc_vectors, dimension, self.index_config)
+
+        bm25 = self.bm25
+        metadata_index = self.metadata_index
+        if documents is not self.documents:
+            bm25 = BM25Index()
+            bm25.add_many([doc['text'] for doc in documents])
+            metadata_index = MetadataIndex()
+            metadata_index.add_many(documents)
+
+        with self._lock:
+            self.documents = documents
+            self.index = index
+            self.bm25 = bm25
+            self.metadata_index = metadata_index
+            self._index_mmapped = False
+        logger.info(f"Built vector index with {index.ntotal} documents")
+        self.save_index()
+
+    def save_index(self):
+        """Persist the index, document store, keyword index and manifest"""
+        with self._lock:
+            os.makedirs(self.store_dir, exist_ok=True)
+            documents_hash = corpus_hash(self.documents, self.model_id)
+            tmp_index = f"{self.index_path}.tmp"
+            if self.index is not None:
+                faiss.write_index(self.index, tmp_index)
+            self.bm25.save(self.bm25_path, documents_hash)
+            tmp_documents = f"{self.documents_path}.tmp"
+            with open(tmp_documents, "w") as f:
+                json.dump(self.documents, f)
+            manifest = {
+                "corpus_hash": documents_hash,
+                "model": self.model_id,
+                "index": self.index_config.build_params(),
+                "documents": len(self.documents),
+                "built_at": datetime.now().isoformat()
+            }
+            if self.index is not None:
+                os.replace(tmp_index, self.index_path)
+            os.replace(tmp_documents, self.documents_path)
+            with open(self.manifest_path, "w") as f:
+                json.dump(manifest, f)
+            self._dirty = False
+
+    def save_if_dirty(self):
+        """Persist documents added since the last save"""
+        if self._dirty:
+            self.save_index()
+
+    def _ensure_writable_index(self):
+        # Memory-mapped inverted lists are read-only, so load the index into memory before adding
+        if self._index_mmapped:
+            self.index = faiss.read_index(self.index_path)
+            apply_search_defaults(self.index, self.index_config)
+            self._index_mmapped = False
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        mode: str = SEARCH_MODE,
+        rerank: Optional[bool] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        filters: Optional[SearchFilters] = None,
+        query_vector: Optional[np.ndarray] = None
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Ranked (document, score) pairs, with scores in [0, 1]"""
+        # One consistent view for the whole query: a prune swaps in new objects
+        # rather than changing these, so doc ids stay valid to the end
+        with self._lock:
+            documents, index, bm25 = self.documents, self.index, self.bm25
+            allowed = self.metadata_index.select(filters)
+        if allowed is not None and not len(allowed):
+            return []
+
+        rerank = RERANK_ENABLED if rerank is None else rerank
+        candidates = max(top_k, HYBRID_CANDIDATES) if mode == "hybrid" or rerank else top_k
+        use_vectors = self.model and index is not None and mode != "keyword"
+
+        if not use_vectors:
+            ranked = self._keyword_ranked(bm25, query, candidates, allowed)
+        elif mode == "vector":
+            try:
+                ranked = self._vector_ranked(index, documents, query, candidates, nprobe, ef_search, allowed, query_vector)
+            except Exception as e:
+                logger.error(f"Error in semantic search: {str(e)}")
+                ranked = self._keyword_ranked(bm25, query, candidates, allowed)
+        else:
+            keyword_future = _search_executor.submit(self._keyword_ranked, bm25, query, candidates, allowed)
+            try:
+                vector_ranked = self._vector_ranked(index, documents, query, candidates, nprobe, ef_search, allowed, query_vector)
+            except Exception as e:
+                logger.error(f"Error in semantic search: {str(e)}")
+                vector_ranked = None
+            keyword_ranked = keyword_future.result()
+            if vector_ranked is None:
+                ranked = keyword_ranked
+            else:
+                ranked = reciprocal_rank_fusion([
+                    [doc_id for doc_id, _ in vector_ranked],
+                    [doc_id for doc_id, _ in keyword_ranked]
+                ])
+
+        if rerank and ranked:
+            pool = [(doc_id, documents[doc_id]['text']) for doc_id, _ in ranked[:self.reranker.top_n]]
+            reranked = self.reranker.rerank(query, pool)
+            if reranked:
+                seen = {doc_id for doc_id, _ in reranked}
+                ranked = reranked + [(doc_id, score) for doc_id, score in ranked if doc_id not in seen]
+
+        return [(documents[doc_id], score) for doc_id, score in ranked[:top_k]]
+
+    def search_documents(
+        self,
+        query: str,
+        top_k: int = 3,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Search documents with fallback to keyword matching"""
+        return [doc for doc, _ in self.search(query, top_k, nprobe=nprobe, ef_search=ef_search)]
+
+    def _vector_ranked(
+        self,
+        index: faiss.Index,
+        documents: List[Dict[str, Any]],
+        query: str,
+        k: int,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        allowed: Optional[np.ndarray] = None,
+        query_vector: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        if query_vector is None:
+            query_vector = self.encode_queries([query])[0]
+
+        approximate = isinstance(index, (faiss.IndexIVF, faiss.IndexHNSW))
+        if approximate and allowed is not None and len(allowed) <= FILTER_EXACT_MAX:
+            # Graph and IVF scans miss most of a very narrow filter, so score the subset
+            # exactly against the vectors the index holds. A flat index is exact already.
+            with self._lock:
+                allowed = allowed[allowed < index.ntotal]
+                vectors = self._reconstruct(index, allowed)
+            distances = ((vectors - query_vector) ** 2).sum(axis=1)
+            order = np.argsort(distances, kind="stable")[:k]
+            return [(int(allowed[i]), float(max(0.0, 1 - distances[i] / 2))) for i in order]
+
+        with self._lock:
+            k = min(k, index.ntotal)
+            if k == 0:
+                return []
+            # The selector filters inside the index scan instead of over-fetching
+            selector = IDSelector(allowed, index.ntotal) if allowed is not None else None
+            distances, indices = index.search(
+                np.array([query_vector]).astype('float32'),
+                k,
+                params=search_params(index, nprobe, ef_search, selector.selector if selector else None)
             )
+        # The model emits unit vectors, so squared L2 distance d is cosine similarity 1 - d / 2
+        return [(int(i), float(max(0.0, 1 - d / 2))) for d, i in zip(distances[0], indices[0]) if i >= 0]
 
-            # Return results
-            return [self.documents[i] for i in indices[0]]
-        except Exception as e:
-            logger.error(f"Error in semantic search: {str(e)}")
-            return self._keyword_search(query, top_k)
+    def _keyword_ranked(
+        self, bm25: BM25Index, query: str, k: int, allowed: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        hits = bm25.search(query, k, allowed)
+        if not hits:
+            return []
+        # BM25 is unbounded, so report scores relative to the best match
+        best = hits[0][1]
+        return [(doc_id, score / best) for doc_id, score in hits]
 
     def _keyword_search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
-        """Simple keyword-based search as fallback"""
-        query_words = set(query.lower().split())
-        results = []
-        
-        for doc in self.documents:
-            doc_words = set(doc['text'].lower().split())
-            score = len(query_words.intersection(doc_words))
-            if score > 0:
-                results.append((score, doc))
-        
-        # Sort by score and return top_k results
-        results.sort(reverse=True)
-        return [doc for _, doc in results[:top_k]]
+        """BM25 keyword search, used when there is no vector index"""
+        return [doc for doc, _ in self.search(query, top_k, mode="keyword", rerank=False)]
 
     def add_document(self, text: str, metadata: Dict[str, Any] = None):
         """Add a new document to the index"""
-        if metadata is None:
-            metadata = {}
-        
-        doc = {
-            'text': text,
-            'metadata': metadata
-        }
-        
-        self.documents.append(doc)
-        
-        # Update FAISS index if model is available
-        if self.model and self.index is not None:
+        self.add_documents([{'text': text, 'metadata': metadata or {}}])
+
+    def add_documents(self, documents: List[Dict[str, Any]], vectors: Optional[np.ndarray] = None):
+        """Append a block of documents with a single index.add call; all stores change or none do"""
+        if not documents:
+            return
+
+        # Encode outside the lock so searches are not held up by the model. A failure
+        # raises here: a document without its vector would shift every later FAISS id.
+        if vectors is None and self.model and self.index is not None:
+            vectors = self.encode([doc['text'] for doc in documents])
+
+        with self._lock:
+            size = len(self.documents)
             try:
-                doc_vector = self.model.encode([text])[0]
-                self.index.add(np.array([doc_vector]).astype('float32'))
+                if vectors is not None and self.index is not None:
+                    vectors = np.asarray(vectors, dtype='float32')
+                    if len(vectors) != len(documents):
+                        raise ValueError(f"{len(vectors)} vectors for {len(documents)} documents")
+                    self._ensure_writable_index()
+                    self.index.add(vectors)
+                self.documents.extend(documents)
+                for doc in documents:
+                    self.bm25.add(doc['text'])
+                    self.metadata_index.add(doc['metadata'])
             except Exception as e:
-                logger.error(f"Error adding document to index: {str(e)}")
+                logger.error(f"Error adding documents, rolling back: {str(e)}")
+                self._rollback(size)
+                raise
+            self._dirty = True
+
+    def _rollback(self, size: int):
+        # Caller holds the lock; restores every store to its first size documents
+        del self.documents[size:]
+        self.bm25.truncate(size)
+        self.metadata_index.truncate(size)
+        if self.index is not None and self.index.ntotal > size:
+            try:
+                self.index.remove_ids(faiss.IDSelectorRange(size, self.index.ntotal))
+            except RuntimeError:
+                # HNSW cannot remove vectors, so rebuild it from the cached embeddings
+                vectors = self.encode([doc['text'] for doc in self.documents])
+                self.index = build_index(vectors, self.index.d, self.index_config)
+
+    def _empty_like(self, index: faiss.Index) -> faiss.Index:
+        # Caller holds the lock. IVF keeps its trained quantizer, so nothing is retrained.
+        if isinstance(index, faiss.IndexIVF):
+            empty = faiss.clone_index(index)
+            empty.reset()
+            return empty
+        if isinstance(index, faiss.IndexHNSW):
+            return create_vector_index(index.d, self.index_config)
+        return faiss.IndexFlatL2(index.d)
+
+    def _reconstruct(self, index: faiss.Index, ids: np.ndarray) -> np.ndarray:
+        """Vectors of the given doc ids as the index stores them; the caller holds the lock"""
+        if isinstance(index, faiss.IndexIVF) and index.direct_map.type == faiss.DirectMap.NoMap:
+            # IVF needs an id -> list map to reconstruct. A hashtable, unlike an array,
+            # keeps working through remove_ids on rollback.
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index.reconstruct_batch(np.ascontiguousarray(ids, dtype=np.int64))
+
+    def _stored_vectors(self, index: faiss.Index, ids: np.ndarray, documents: List[Dict[str, Any]]) -> np.ndarray:
+        """Vectors of the given doc ids, read back from the index where it stores them exactly"""
+        if isinstance(index, faiss.IndexIVF):
+            # IVF-PQ codes do not decode to the original vectors; the embedding cache has them
+            return self.encode([documents[i]['text'] for i in ids])
+        return index.reconstruct_batch(np.asarray(ids, dtype=np.int64))
+
+    def prune_documents(self, keep: Callable[[Dict[str, Any]], bool]) -> int:
+        """Drop documents failing keep, compacting the stores in place of a rebuild; returns the number removed"""
+        with self._lock:
+            self._ensure_writable_index()
+            documents, index = self.documents, self.index
+            bm25, metadata_index = self.bm25, self.metadata_index
+            size = len(documents)
+            mask = np.fromiter((bool(keep(doc)) for doc in documents), dtype=bool, count=size)
+            removed = size - int(mask.sum())
+            if not removed:
+                return 0
+            kept_ids = np.flatnonzero(mask)
+            compacted = None
+            if index is not None:
+                compacted = self._empty_like(index)
+                vectors = None if isinstance(index, faiss.IndexIVF) else self._stored_vectors(index, kept_ids, documents)
+
+        # Searches keep running on the old objects while the replacements are filled
+        kept = [documents[i] for i in kept_ids]
+        if compacted is not None:
+            if vectors is None:
+                vectors = self._stored_vectors(index, kept_ids, documents)
+            if len(vectors):
+                compacted.add(np.asarray(vectors, dtype='float32'))
+        new_bm25 = bm25.compact(mask)
+        new_metadata_index = metadata_index.compact(mask)
+
+        with self._lock:
+            if self.documents is not documents or self.index is not index:
+                logger.warning("Document store was replaced while pruning, skipping this prune")
+                return 0
+            # Documents appended while compacting carry over to the new stores
+            appended = self.documents[size:]
+            if appended:
+                kept.extend(appended)
+                new_bm25.add_many([doc['text'] for doc in appended])
+                new_metadata_index.add_many(appended)
+                if compacted is not None:
+                    compacted.add(self._stored_vectors(index, np.arange(size, size + len(appended)), self.documents))
+            self.documents = kept
+            self.index = compacted
+            self.bm25 = new_bm25
+            self.metadata_index = new_metadata_index
+            self._dirty = True
+        logger.info(f"Pruned {removed} documents, {len(kept)} remain")
+        return removed
+
+    def retrain_index(self) -> bool:
+        """Swap an exact index for the configured ANN type once the corpus is large enough to train"""
+        with self._lock:
+            if (
+                self.index is None
+                or self.index_config.index_type == "flat"
+                or not isinstance(self.index, faiss.IndexFlat)
+                or self.index.ntotal < self.index_config.min_train_size()
+            ):
+                return False
+            self._ensure_writable_index()
+            snapshot = self.index
+            # An exact index stores the raw vectors, so nothing needs re-embedding
+            vectors = snapshot.reconstruct_n(0, snapshot.ntotal)
+
+        index = build_index(vectors, snapshot.d, self.index_config)
+        with self._lock:
+            if self.index is not snapshot:
+                # A prune or rebuild swapped the index meanwhile; its ids no longer match these vectors
+                logger.warning("Vector index was replaced while retraining, skipping this retrain")
+                return False
+            # Documents appended while training are added to the new index too
+            if snapshot.ntotal > len(vectors):
+                index.add(snapshot.reconstruct_n(len(vectors), snapshot.ntotal - len(vectors)))
+            self.index = index
+            self._dirty = True
+        logger.info(f"Retrained vector index as {self.index_config.index_type} over {index.ntotal} documents")
+        return True
 
 # Initialize global retriever instance
 retriever = RetrieverAgent()
 
-def search_documents(query: str, top_k: int = 3) -> SearchResults:
+# Concurrent requests share one forward pass instead of encoding a query each
+query_encoder = MicroBatcher(lambda queries: retriever.encode_queries(queries), name="query_encoder")
+
+def search_documents(
+    query: str,
+    top_k: int = 3,
+    mode: str = SEARCH_MODE,
+    rerank: Optional[bool] = None,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    filters: Optional[SearchFilters] = None
+) -> SearchResults:
     """
     Global function to search documents using the retriever agent.
+    mode is "hybrid", "vector" or "keyword"; nprobe / ef_search override
+    the index defaults for this query only; filters restrict by date,
+    category and ticker metadata.
     """
-    results = retriever.search_documents(query, top_k)
-    return SearchResults(results=[SearchResult(text=result['text'], metadata=result['metadata']) for result in results])
+    results = retriever.search(
+        query, top_k, mode=mode, rerank=rerank, nprobe=nprobe, ef_search=ef_search, filters=filters
+    )
+    return SearchResults(results=[
+        SearchResult(text=doc['text'], metadata=doc['metadata'], score=score)
+        for doc, score in results
+    ])
+
+async def embed_query_async(query: str) -> Optional[np.ndarray]:
+    """Query embedding via the micro-batching encoder, or None when no model is loaded"""
+    if not retriever.model:
+        return None
+    return await query_encoder.submit(query)
+
+async def search_documents_async(
+    query: str,
+    top_k: int = 3,
+    mode: str = SEARCH_MODE,
+    rerank: Optional[bool] = None,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    filters: Optional[SearchFilters] = None,
+    query_vector: Optional[np.ndarray] = None
+) -> SearchResults:
+    """search_documents for the event loop: batched query encoding, index search in a worker thread"""
+    if query_vector is None and mode != "keyword":
+        query_vector = await embed_query_async(query)
+    results = await asyncio.to_thread(
+        retriever.search, query, top_k, mode=mode, rerank=rerank, nprobe=nprobe, ef_search=ef_search,
+        filters=filters, query_vector=query_vector
+    )
+    return SearchResults(results=[
+        SearchResult(text=doc['text'], metadata=doc['metadata'], score=score)
+        for doc, score in results
+    ])
 
 class Document(BaseModel):
     text: str
@@ -147,27 +626,9 @@ class SearchResponse(BaseModel):
     scores: List[float]
 
 def create_index(documents: List[Document]):
-    """Create a new FAISS index from documents"""
+    """Create a new FAISS index from documents and persist it"""
     try:
-        global index
-        
-        if model is None:
-            raise Exception("SentenceTransformer model not loaded")
-        
-        # Get document embeddings
-        texts = [doc.text for doc in documents]
-        embeddings = model.encode(texts)
-        
-        # Create FAISS index
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dimension)
-        index.add(embeddings.astype('float32'))
-        
-        # Save index and documents
-        faiss.write_index(index, "vector_store/index.faiss")
-        with open("vector_store/documents.json", "w") as f:
-            json.dump([doc.dict() for doc in documents], f)
-            
+        retriever.rebuild_index([doc.dict() for doc in documents])
     except Exception as e:
         logger.error(f"Error creating index: {str(e)}")
         raise
@@ -175,17 +636,9 @@ def create_index(documents: List[Document]):
 def load_index():
     """Load the FAISS index and documents from disk"""
     try:
-        global index, documents
-        
-        # Load FAISS index if it exists
-        if os.path.exists("vector_store/index.faiss"):
-            index = faiss.read_index("vector_store/index.faiss")
-        
-        # Load documents if they exist
-        if os.path.exists("vector_store/documents.json"):
-            with open("vector_store/documents.json", "r") as f:
-                documents = json.load(f)
-                
+        retriever.documents = retriever._load_documents()
+        retriever.load_keyword_index()
+        retriever.load_index()
     except Exception as e:
         logger.error(f"Error loading index: {str(e)}")
-        raise
\ No newline at end of file
+        raise
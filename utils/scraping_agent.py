@@ -1,8 +1,7 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import requests
-from bs4 import BeautifulSoup
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
@@ -10,7 +9,15 @@ import os
 from dotenv import load_dotenv
 import asyncio
 import aiohttp
-from newspaper import Article
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from utils.api_agent import fetch_bulk_quotes_yfinance
+from utils.article_parser import parse_listing, parse_article
+from utils.fundamentals import fundamentals
+from utils.http_cache import http_cache, article_store, content_hash
+from utils.quote_cache import QuoteCache
+from utils.sentiment import sentiment_scorer, article_text
 import logging
 import time
 
@@ -21,6 +28,18 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# News pipeline configuration
+NEWS_CONCURRENCY = int(os.getenv("NEWS_CONCURRENCY", "16"))
+NEWS_PER_HOST = int(os.getenv("NEWS_PER_HOST", "4"))
+NEWS_DEADLINE = float(os.getenv("NEWS_DEADLINE", "20"))
+NEWS_REQUEST_TIMEOUT = float(os.getenv("NEWS_REQUEST_TIMEOUT", "10"))
+NEWS_ARTICLES_PER_SYMBOL = int(os.getenv("NEWS_ARTICLES_PER_SYMBOL", "5"))
+NEWS_PARSE_WORKERS = int(os.getenv("NEWS_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+NEWS_USER_AGENT = os.getenv(
+    "NEWS_USER_AGENT",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
 class NewsItem(BaseModel):
     title: str
     url: str
@@ -28,65 +47,207 @@ class NewsItem(BaseModel):
     summary: str
     published_at: datetime
     sentiment: float = 0.0
+    symbols: List[str] = []
+    text: str = ""
+
+_news_session: Optional[aiohttp.ClientSession] = None
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+def get_news_session() -> aiohttp.ClientSession:
+    """Shared session; the connector enforces total and per-host connection limits"""
+    global _news_session
+    if _news_session is None or _news_session.closed:
+        _news_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=NEWS_CONCURRENCY, limit_per_host=NEWS_PER_HOST),
+            timeout=aiohttp.ClientTimeout(total=NEWS_REQUEST_TIMEOUT),
+            headers={"User-Agent": NEWS_USER_AGENT}
+        )
+    return _news_session
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        # Spawned, not forked: a fork would copy the event loop, open sockets and the
+        # SQLite connections of the serving process into every worker
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=NEWS_PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _parse_pool
+
+# yfinance prices get their own cache: the shared quote cache holds Alpha Vantage quotes
+yfinance_quote_cache = QuoteCache()
+
+def scraper_stats() -> Dict[str, Any]:
+    return {
+        "http_cache": http_cache.stats(),
+        "articles": article_store.stats(),
+        "sentiment": sentiment_scorer.stats(),
+        "yfinance_quotes": yfinance_quote_cache.stats()
+    }
+
+async def close_scraper():
+    """Close the shared session and parser processes"""
+    global _news_session, _parse_pool
+    if _news_session is not None:
+        await _news_session.close()
+        _news_session = None
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
+async def fetch_text(url: str) -> Optional[str]:
+    """GET through the HTTP cache: fresh copies skip the network, stale ones are revalidated"""
+    cached = await asyncio.to_thread(http_cache.get, url)
+    if cached and cached.is_fresh:
+        http_cache.record_fresh_hit(cached)
+        return cached.body
+
+    session = get_news_session()
+    async with session.get(url, headers=cached.validators() if cached else None) as response:
+        if response.status == 304 and cached:
+            await asyncio.to_thread(http_cache.record_not_modified, cached, response.headers.get("Cache-Control"))
+            return cached.body
+        if response.status != 200:
+            logger.warning(f"Fetching {url} returned HTTP {response.status}")
+            return None
+        body = await response.text()
+        await asyncio.to_thread(
+            http_cache.store,
+            url,
+            body,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            response.headers.get("Cache-Control")
+        )
+        return body
 
-async def fetch_news(symbols: List[str], days: int = 7) -> List[NewsItem]:
-    """Fetch news articles for given symbols"""
+async def fetch_news(
+    symbols: List[str],
+    days: int = 7,
+    deadline: float = NEWS_DEADLINE,
+    per_symbol: int = NEWS_ARTICLES_PER_SYMBOL
+) -> List[NewsItem]:
+    """Fetch news articles for given symbols, returning whatever finished before the deadline"""
     try:
-        news_items = []
-        async with aiohttp.ClientSession() as session:
-            for symbol in symbols:
-                # Fetch news from Yahoo Finance
-                url = f"https://finance.yahoo.com/quote/{symbol}/news"
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        soup = BeautifulSoup(html, 'html.parser')
-                        
-                        # Extract news articles
-                        articles = soup.find_all('div', {'class': 'js-content-viewer'})
-                        for article in articles[:5]:  # Limit to 5 articles per symbol
-                            try:
-                                link = article.find('a')['href']
-                                if not link.startswith('http'):
-                                    link = f"https://finance.yahoo.com{link}"
-                                
-                                # Get article details
-                                article_obj = Article(link)
-                                article_obj.download()
-                                article_obj.parse()
-                                
-                                news_items.append(NewsItem(
-                                    title=article_obj.title,
-                                    url=link,
-                                    source="Yahoo Finance",
-                                    summary=article_obj.summary,
-                                    published_at=article_obj.publish_date or datetime.now(),
-                                    sentiment=0.0  # Sentiment analysis can be added here
-                                ))
-                            except Exception as e:
-                                logger.warning(f"Error processing article: {str(e)}")
-                                continue
-                    
-        return news_items
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        pool = get_parse_pool()
+        cutoff = datetime.now() - timedelta(days=days)
+        items: Dict[str, NewsItem] = {}
+        in_flight: Dict[str, asyncio.Task] = {}
+        link_symbols: Dict[str, List[str]] = {}
+
+        async def process_article(url: str):
+            # Articles parsed on an earlier run are neither downloaded nor parsed again
+            parsed = await asyncio.to_thread(article_store.get_by_url, url)
+            if parsed is None:
+                html = await fetch_text(url)
+                if not html:
+                    return
+                body_hash = content_hash(html)
+                parsed = await asyncio.to_thread(article_store.get_by_content, url, body_hash)
+                if parsed is None:
+                    # newspaper parsing is CPU bound, so keep it off the event loop
+                    parsed = await loop.run_in_executor(pool, parse_article, url, html)
+                    parsed = await asyncio.to_thread(article_store.put, url, body_hash, parsed)
+            # Undated articles keep the time they were first scraped, not the time of this run
+            published_at = parsed["published_at"] or parsed["first_seen"]
+            if published_at.replace(tzinfo=None) < cutoff:
+                return
+            items[url] = NewsItem(
+                title=parsed["title"],
+                url=url,
+                source="Yahoo Finance",
+                summary=parsed["summary"],
+                published_at=published_at,
+                symbols=link_symbols[url],
+                text=parsed["text"]
+            )
+
+        async def process_article_safely(url: str):
+            try:
+                await process_article(url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Error processing article {url}: {str(e)}")
+
+        async def process_symbol(symbol: str):
+            try:
+                html = await fetch_text(f"https://finance.yahoo.com/quote/{symbol}/news")
+                if not html:
+                    return
+                links = await loop.run_in_executor(pool, parse_listing, html, per_symbol)
+            except Exception as e:
+                logger.warning(f"Error fetching news listing for {symbol}: {str(e)}")
+                return
+
+            for link in links:
+                # The same story is often listed under several symbols; download it once
+                link_symbols.setdefault(link, []).append(symbol)
+                if link not in in_flight:
+                    in_flight[link] = asyncio.create_task(process_article_safely(link))
+
+        async def run_all():
+            await asyncio.gather(*(process_symbol(symbol) for symbol in dict.fromkeys(symbols)))
+            await asyncio.gather(*in_flight.values())
+
+        try:
+            await asyncio.wait_for(run_all(), timeout=deadline)
+        except asyncio.TimeoutError:
+            logger.warning(f"News deadline of {deadline}s hit, returning {len(items)} articles collected so far")
+            for task in in_flight.values():
+                task.cancel()
+            await asyncio.gather(*in_flight.values(), return_exceptions=True)
+
+        collected = list(items.values())
+        try:
+            # One batch for the whole run, bounded by what is left of the deadline; cached
+            # scores make repeat scrapes nearly free. Articles are only updated if it finishes,
+            # and a late batch still fills the cache for the next run
+            texts = [article_text(item) for item in collected]
+            remaining = max(deadline - (loop.time() - started), 0)
+            scores = await asyncio.wait_for(asyncio.to_thread(sentiment_scorer.score_many, texts), timeout=remaining)
+            sentiment_scorer.apply_scores(collected, scores)
+        except asyncio.TimeoutError:
+            logger.warning(f"News deadline of {deadline}s hit while scoring, returning {len(collected)} articles unscored")
+        except Exception as e:
+            logger.warning(f"Error scoring news sentiment: {str(e)}")
+        return collected
         
     except Exception as e:
         logger.error(f"Error fetching news: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def load_quote(symbol: str) -> Optional[Dict[str, Any]]:
+    return (await fetch_bulk_quotes_yfinance([symbol])).get(symbol)
+
 async def fetch_stock_data(symbol: str) -> Dict[str, Any]:
     """Fetch stock data from Yahoo Finance"""
     try:
-        stock = yf.Ticker(symbol)
-        info = stock.info
+        # Fundamentals come from the long-TTL cache; prices from the short-TTL quote cache.
+        # Either one failing leaves the other to answer.
+        info, quote = await asyncio.gather(
+            fundamentals.get(symbol),
+            yfinance_quote_cache.get_or_load(symbol, load_quote),
+            return_exceptions=True
+        )
+        for name, result in (("fundamentals", info), ("quote", quote)):
+            if isinstance(result, Exception):
+                logger.warning(f"Error fetching {name} for {symbol}: {str(result)}")
+        if isinstance(info, Exception) and isinstance(quote, Exception):
+            raise quote
+        info = info if isinstance(info, dict) else {}
+        quote = quote if isinstance(quote, dict) else None
         
         return {
             "symbol": symbol,
-            "price": info.get("regularMarketPrice", 0),
-            "change": info.get("regularMarketChangePercent", 0),
-            "volume": info.get("regularMarketVolume", 0),
-            "market_cap": info.get("marketCap", 0),
-            "pe_ratio": info.get("trailingPE", 0),
-            "dividend_yield": info.get("dividendYield", 0)
+            "price": quote["price"] if quote else info.get("regularMarketPrice") or 0,
+            "change": quote["change_percent"] if quote else info.get("regularMarketChangePercent") or 0,
+            "volume": quote["volume"] if quote else info.get("regularMarketVolume") or 0,
+            "market_cap": info.get("marketCap") or 0,
+            "pe_ratio": info.get("trailingPE") or 0,
+            "dividend_yield": info.get("dividendYield") or 0
         }
         
     except Exception as e:
@@ -95,37 +256,15 @@ async def fetch_stock_data(symbol: str) -> Dict[str, Any]:
 
 def fetch_news_articles(query: str = "", max_articles: int = 5) -> List[Dict[str, Any]]:
     """
-    Fetch financial news articles from various sources.
-    Currently returns dummy data as a placeholder.
+    Fetch financial news articles indexed by the background news feed.
+    Returns the latest articles, or the most relevant ones when a query is given.
+    Only the API process runs the feed; other processes should call its /news route.
     """
     try:
-        # TODO: Implement actual news scraping
-        # For now, return dummy data
-        dummy_articles = [
-            {
-                "title": "Tech Stocks Show Strong Growth",
-                "source": "Financial Times",
-                "url": "https://example.com/article1",
-                "summary": "Technology stocks continue to show strong performance in the market.",
-                "date": "2024-03-15"
-            },
-            {
-                "title": "Federal Reserve Maintains Interest Rates",
-                "source": "Wall Street Journal",
-                "url": "https://example.com/article2",
-                "summary": "The Federal Reserve has decided to keep interest rates unchanged.",
-                "date": "2024-03-14"
-            },
-            {
-                "title": "Global Markets Face Volatility",
-                "source": "Bloomberg",
-                "url": "https://example.com/article3",
-                "summary": "Global markets are experiencing increased volatility due to geopolitical tensions.",
-                "date": "2024-03-13"
-            }
-        ]
-        
-        return dummy_articles[:max_articles]
+        # Imported here because the feed itself depends on this module
+        from utils.news_feed import recent_news
+
+        return recent_news(query, max_articles)
     except Exception as e:
         logger.error(f"Error fetching news articles: {str(e)}")
         return []
\ No newline at end of file
@@ -0,0 +1,285 @@
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import os
+import logging
+
+import numpy as np
+
+from utils.sqlite_store import connect, select_many
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "model" runs a small financial-news classifier on CPU and falls back to the
+# lexicon if it cannot be loaded; "lexicon" skips the model entirely
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "model").lower()
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL", "mrm8488/distilroberta-finetuned-financial-news-sentiment-analysis")
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "32"))
+SENTIMENT_MAX_LENGTH = int(os.getenv("SENTIMENT_MAX_LENGTH", "128"))
+SENTIMENT_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", "data/sentiment_cache.sqlite")
+SENTIMENT_WINDOW_HOURS = float(os.getenv("SENTIMENT_WINDOW_HOURS", "72"))
+SENTIMENT_HALF_LIFE_HOURS = float(os.getenv("SENTIMENT_HALF_LIFE_HOURS", "24"))
+
+# Scores beyond these bounds are labelled positive / negative
+SENTIMENT_THRESHOLD = 0.15
+
+POSITIVE_WORDS = {
+    "beat", "beats", "gain", "gains", "gained", "growth", "grew", "surge", "surged", "surges", "rally",
+    "rallied", "rallies", "record", "strong", "stronger", "upgrade", "upgraded", "outperform", "profit",
+    "profitable", "rise", "rises", "rose", "rising", "jump", "jumped", "jumps", "soar", "soared", "boost",
+    "boosted", "bullish", "exceed", "exceeded", "exceeds", "optimistic", "improve", "improved", "expansion",
+    "higher", "positive", "recovery", "rebound", "rebounded", "buyback", "dividend", "raise", "raised"
+}
+NEGATIVE_WORDS = {
+    "miss", "misses", "missed", "loss", "losses", "lost", "decline", "declined", "declines", "drop", "dropped",
+    "drops", "fall", "falls", "fell", "falling", "plunge", "plunged", "slump", "slumped", "weak", "weaker",
+    "downgrade", "downgraded", "underperform", "lawsuit", "probe", "investigation", "recall", "layoffs",
+    "bearish", "cut", "cuts", "warning", "warns", "warned", "lower", "negative", "risk", "risks", "concern",
+    "concerns", "fraud", "bankruptcy", "default", "sell-off", "selloff", "slowdown", "recession", "tumble",
+    "tumbled", "sink", "sank"
+}
+NEGATIONS = {"not", "no", "never", "without", "fails", "failed", "didn't", "doesn't", "isn't", "wasn't"}
+
+WORD_PATTERN = re.compile(r"[a-z][a-z'-]*")
+
+def lexicon_score(text: str) -> float:
+    """Polarity in [-1, 1] from finance word counts; a negation flips the next hit within two words"""
+    words = WORD_PATTERN.findall(text.lower())
+    positive = negative = 0
+    negated_until = -1
+    for i, word in enumerate(words):
+        if word in NEGATIONS:
+            negated_until = i + 2
+            continue
+        polarity = 1 if word in POSITIVE_WORDS else -1 if word in NEGATIVE_WORDS else 0
+        if not polarity:
+            continue
+        if i <= negated_until:
+            polarity = -polarity
+            negated_until = -1
+        if polarity > 0:
+            positive += 1
+        else:
+            negative += 1
+    # The +1 keeps a single matching word from scoring a full +/-1
+    return (positive - negative) / (positive + negative + 1)
+
+def sentiment_label(score: float) -> str:
+    if score > SENTIMENT_THRESHOLD:
+        return "Positive"
+    if score < -SENTIMENT_THRESHOLD:
+        return "Negative"
+    return "Neutral"
+
+def article_text(item: Any) -> str:
+    """Headline and lede: what the classifier was trained on, and far cheaper than the full body"""
+    return f"{item.title}. {item.summary}".strip()
+
+class SentimentScorer:
+    """Batched CPU sentiment in [-1, 1] with a persistent content-hash score cache"""
+
+    def __init__(
+        self,
+        backend: str = SENTIMENT_BACKEND,
+        model_name: str = SENTIMENT_MODEL,
+        batch_size: int = SENTIMENT_BATCH_SIZE,
+        max_length: int = SENTIMENT_MAX_LENGTH,
+        cache_path: Optional[str] = SENTIMENT_CACHE_PATH
+    ):
+        self.backend = backend
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.cache_path = cache_path
+        self.model = None
+        self.tokenizer = None
+        self._load_failed = backend != "model"
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if cache_path:
+            try:
+                self._conn = connect(cache_path)
+                self._conn.execute("CREATE TABLE IF NOT EXISTS sentiment (hash TEXT PRIMARY KEY, score REAL NOT NULL)")
+                self._conn.commit()
+            except Exception as e:
+                logger.warning(f"Sentiment cache unavailable: {str(e)}")
+                self._conn = None
+        self.hits = 0
+        self.misses = 0
+        self.scored_by_model = 0
+        self.scored_by_lexicon = 0
+        self.score_time = 0.0
+
+    def _get_model(self):
+        with self._load_lock:
+            if self.model is None and not self._load_failed:
+                try:
+                    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+                    self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                    self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name).eval()
+                    logger.info(f"Loaded sentiment model {self.model_name}")
+                except Exception as e:
+                    logger.warning(f"Failed to load sentiment model, using the lexicon: {str(e)}")
+                    self._load_failed = True
+            return self.model
+
+    @property
+    def scorer_id(self) -> str:
+        """Identity of whatever produces the scores; model and lexicon scores are cached apart"""
+        return self.model_name if self._get_model() is not None else "lexicon"
+
+    def _model_scores(self, texts: List[str]) -> np.ndarray:
+        import torch
+
+        labels = {index: label.lower() for index, label in self.model.config.id2label.items()}
+        positive = [index for index, label in labels.items() if label.startswith("pos")]
+        negative = [index for index, label in labels.items() if label.startswith("neg")]
+
+        scores = np.zeros(len(texts), dtype=np.float32)
+        # Batching similar lengths together keeps padding, and so wasted compute, low
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            inputs = self.tokenizer(
+                [texts[i] for i in batch], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="pt"
+            )
+            with torch.inference_mode():
+                probabilities = torch.softmax(self.model(**inputs).logits, dim=-1).numpy()
+            scores[batch] = probabilities[:, positive].sum(axis=1) - probabilities[:, negative].sum(axis=1)
+        return scores
+
+    def _score_uncached(self, texts: List[str]) -> Tuple[List[float], str]:
+        """Scores plus the id of the scorer that produced them, which is the lexicon if the model fails"""
+        started = time.perf_counter()
+        try:
+            if self._get_model() is not None:
+                try:
+                    scores = self._model_scores(texts).tolist()
+                    self.scored_by_model += len(texts)
+                    return scores, self.model_name
+                except Exception as e:
+                    logger.error(f"Error scoring sentiment with the model: {str(e)}")
+            self.scored_by_lexicon += len(texts)
+            return [lexicon_score(text) for text in texts], "lexicon"
+        finally:
+            self.score_time += time.perf_counter() - started
+
+    def _keys(self, texts: List[str], scorer_id: str) -> List[str]:
+        return [hashlib.sha256(f"{scorer_id}\0{text}".encode("utf-8")).hexdigest() for text in texts]
+
+    def _get_many(self, keys: List[str]) -> Dict[str, float]:
+        with self._lock:
+            return dict(select_many(self._conn, "sentiment", "hash", "score", keys))
+
+    def score_many(self, texts: List[str]) -> List[float]:
+        """Sentiment per text, running the scorer only on texts not seen before"""
+        if not texts:
+            return []
+        if self._conn is None:
+            self.misses += len(texts)
+            return self._score_uncached(texts)[0]
+
+        keys = self._keys(texts, self.scorer_id)
+        found = self._get_many(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            scores, scorer_id = self._score_uncached(list(missing.values()))
+            found.update(zip(missing.keys(), scores))
+            # Lexicon fallbacks after a model error are stored as lexicon scores, so the
+            # model still gets to score these texts on the next call
+            stored_keys = list(missing.keys()) if scorer_id == self.scorer_id else self._keys(list(missing.values()), scorer_id)
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO sentiment (hash, score) VALUES (?, ?)", zip(stored_keys, scores)
+                )
+                self._conn.commit()
+        return [float(found[key]) for key in keys]
+
+    def score_items(self, items: List[Any]) -> List[Any]:
+        """Fill in the sentiment of news items in one batch and record it in the rolling aggregates"""
+        return self.apply_scores(items, self.score_many([article_text(item) for item in items]))
+
+    def apply_scores(self, items: List[Any], scores: List[float]) -> List[Any]:
+        """Set precomputed sentiment on news items and record it in the rolling aggregates"""
+        for item, score in zip(items, scores):
+            item.sentiment = score
+            sentiment_tracker.observe(item.symbols, item.url, item.published_at, score)
+        return items
+
+    def stats(self) -> Dict[str, Any]:
+        scored = self.scored_by_model + self.scored_by_lexicon
+        return {
+            "backend": "model" if self.model is not None else "lexicon",
+            "model": self.model_name,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "scored_by_model": self.scored_by_model,
+            "scored_by_lexicon": self.scored_by_lexicon,
+            "texts_per_second": scored / self.score_time if self.score_time else None
+        }
+
+class SentimentTracker:
+    """Rolling per-symbol news sentiment over a time window, weighted toward recent articles"""
+
+    def __init__(self, window_hours: float = SENTIMENT_WINDOW_HOURS, half_life_hours: float = SENTIMENT_HALF_LIFE_HOURS):
+        self.window = window_hours * 3600
+        self.half_life = half_life_hours * 3600
+        # symbol -> url -> (published timestamp, score); keyed by url so re-scraped stories count once
+        self._observations: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, symbols: List[str], url: str, published_at: datetime, score: float):
+        timestamp = published_at.timestamp()
+        with self._lock:
+            for symbol in symbols:
+                self._observations.setdefault(symbol.upper(), {})[url] = (timestamp, score)
+
+    def _prune(self, now: float):
+        cutoff = now - self.window
+        for symbol in list(self._observations):
+            observations = self._observations[symbol]
+            for url in [url for url, (timestamp, _) in observations.items() if timestamp < cutoff]:
+                del observations[url]
+            if not observations:
+                del self._observations[symbol]
+
+    def aggregate(self, symbols: Optional[List[str]] = None, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Per-symbol decayed score, plain mean and article counts within the window"""
+        now = now or time.time()
+        with self._lock:
+            self._prune(now)
+            selected = [symbol.upper() for symbol in symbols] if symbols is not None else list(self._observations)
+            snapshot = {symbol: list(self._observations.get(symbol, {}).values()) for symbol in selected}
+
+        summary = {}
+        for symbol, observations in snapshot.items():
+            if not observations:
+                summary[symbol] = {"score": 0.0, "mean": 0.0, "articles": 0, "positive": 0, "negative": 0, "label": "Neutral"}
+                continue
+            timestamps = np.array([timestamp for timestamp, _ in observations])
+            scores = np.array([score for _, score in observations])
+            weights = 0.5 ** (np.maximum(now - timestamps, 0) / self.half_life)
+            score = float(np.sum(weights * scores) / np.sum(weights))
+            summary[symbol] = {
+                "score": score,
+                "mean": float(scores.mean()),
+                "articles": len(observations),
+                "positive": int(np.sum(scores > SENTIMENT_THRESHOLD)),
+                "negative": int(np.sum(scores < -SENTIMENT_THRESHOLD)),
+                "label": sentiment_label(score)
+            }
+        return summary
+
+# Shared scorer and per-symbol aggregates
+sentiment_tracker = SentimentTracker()
+sentiment_scorer = SentimentScorer()
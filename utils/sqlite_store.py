@@ -0,0 +1,46 @@
+from typing import Any, Iterable, List, Tuple
+import sqlite3
+import time
+import os
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of bound parameters per statement
+LOOKUP_BATCH = 500
+
+def connect(path: str) -> sqlite3.Connection:
+    """Connection shared across threads (callers lock around it), in WAL mode"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    # Readers do not block the writer, and commits skip the fsync per transaction
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def select_many(
+    conn: sqlite3.Connection, table: str, key_column: str, value_column: str, keys: Iterable[Any]
+) -> List[Tuple[Any, Any]]:
+    """(key, value) rows for the given keys, looked up LOOKUP_BATCH at a time"""
+    rows = []
+    unique = list(dict.fromkeys(keys))
+    for start in range(0, len(unique), LOOKUP_BATCH):
+        batch = unique[start:start + LOOKUP_BATCH]
+        rows.extend(conn.execute(
+            f"SELECT {key_column}, {value_column} FROM {table} WHERE {key_column} IN ({','.join('?' * len(batch))})",
+            batch
+        ).fetchall())
+    return rows
+
+def prune_rows(conn: sqlite3.Connection, table: str, time_column: str, max_age: float, max_entries: int) -> int:
+    """Delete rows older than max_age seconds, then the oldest beyond max_entries; returns how many went"""
+    removed = conn.execute(f"DELETE FROM {table} WHERE {time_column} < ?", (time.time() - max_age,)).rowcount
+    removed += conn.execute(
+        f"DELETE FROM {table} WHERE rowid IN "
+        f"(SELECT rowid FROM {table} ORDER BY {time_column} DESC LIMIT -1 OFFSET ?)",
+        (max_entries,)
+    ).rowcount
+    conn.commit()
+    return removed
@@ -0,0 +1,207 @@
+from typing import Dict, Any, List, Optional
+from collections import deque
+import math
+import json
+import os
+import threading
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STREAMING_WINDOW = int(os.getenv("STREAMING_WINDOW", "20"))
+STREAMING_EWMA_LAMBDA = float(os.getenv("STREAMING_EWMA_LAMBDA", "0.94"))
+STREAMING_STATE_PATH = os.getenv("STREAMING_STATE_PATH", "data/streaming_analytics.json")
+
+class RunningStats:
+    """Welford running mean and variance"""
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+class EWMAVolatility:
+    """Exponentially weighted volatility, RiskMetrics style"""
+
+    def __init__(self, decay: float = STREAMING_EWMA_LAMBDA, variance: Optional[float] = None):
+        self.decay = decay
+        self.variance = variance
+
+    def update(self, value: float):
+        if self.variance is None:
+            self.variance = value * value
+        else:
+            self.variance = self.decay * self.variance + (1 - self.decay) * value * value
+
+    @property
+    def volatility(self) -> float:
+        return math.sqrt(self.variance) if self.variance is not None else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"decay": self.decay, "variance": self.variance}
+
+class RollingWindow:
+    """Fixed-size window with O(1) updates of its mean and variance"""
+
+    def __init__(self, size: int = STREAMING_WINDOW, values: Optional[List[float]] = None):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.total_sq = 0.0
+        for value in values or []:
+            self.update(value)
+
+    def update(self, value: float):
+        if len(self.values) == self.size:
+            evicted = self.values[0]
+            self.total -= evicted
+            self.total_sq -= evicted * evicted
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    @property
+    def mean(self) -> float:
+        return self.total / len(self.values) if self.values else 0.0
+
+    @property
+    def std(self) -> float:
+        n = len(self.values)
+        if n < 2:
+            return 0.0
+        return math.sqrt(max(0.0, (self.total_sq - self.total * self.total / n) / (n - 1)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"size": self.size, "values": list(self.values)}
+
+class SymbolAnalytics:
+    """Incremental analytics for one symbol, updated tick by tick"""
+
+    def __init__(self, window: int = STREAMING_WINDOW, decay: float = STREAMING_EWMA_LAMBDA):
+        self.last_price: Optional[float] = None
+        self.last_tick: Optional[str] = None
+        self.ticks = 0
+        self.returns = RunningStats()
+        self.ewma = EWMAVolatility(decay)
+        self.return_window = RollingWindow(window)
+        self.price_window = RollingWindow(window)
+
+    def update(self, price: float, tick: Optional[str] = None) -> bool:
+        """Fold in a new price, ignoring repeats of the tick we already saw"""
+        if price <= 0:
+            return False
+        if self.last_price is not None and price == self.last_price and tick == self.last_tick:
+            return False
+
+        if self.last_price is not None:
+            change = price / self.last_price - 1.0
+            self.returns.update(change)
+            self.ewma.update(change)
+            self.return_window.update(change)
+        self.price_window.update(price)
+        self.last_price = price
+        self.last_tick = tick
+        self.ticks += 1
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        # Returns and volatilities are reported in percent
+        return {
+            "price": self.last_price,
+            "ticks": self.ticks,
+            "mean_return": self.returns.mean * 100,
+            "volatility": self.returns.std * 100,
+            "ewma_volatility": self.ewma.volatility * 100,
+            "rolling_volatility": self.return_window.std * 100,
+            "moving_average": self.price_window.mean
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "last_price": self.last_price,
+            "last_tick": self.last_tick,
+            "ticks": self.ticks,
+            "returns": self.returns.to_dict(),
+            "ewma": self.ewma.to_dict(),
+            "return_window": self.return_window.to_dict(),
+            "price_window": self.price_window.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "SymbolAnalytics":
+        analytics = cls()
+        analytics.last_price = state["last_price"]
+        analytics.last_tick = state["last_tick"]
+        analytics.ticks = state["ticks"]
+        analytics.returns = RunningStats(**state["returns"])
+        analytics.ewma = EWMAVolatility(**state["ewma"])
+        analytics.return_window = RollingWindow(**state["return_window"])
+        analytics.price_window = RollingWindow(**state["price_window"])
+        return analytics
+
+class StreamingAnalytics:
+    """Per-symbol incremental analytics fed by the market data fetcher"""
+
+    def __init__(self, window: int = STREAMING_WINDOW, decay: float = STREAMING_EWMA_LAMBDA):
+        self.window = window
+        self.decay = decay
+        self._symbols: Dict[str, SymbolAnalytics] = {}
+        self._lock = threading.Lock()
+
+    def update(self, symbol: str, price: float, tick: Optional[str] = None) -> bool:
+        with self._lock:
+            analytics = self._symbols.get(symbol)
+            if analytics is None:
+                analytics = self._symbols[symbol] = SymbolAnalytics(self.window, self.decay)
+            return analytics.update(price, tick)
+
+    def snapshot(self, symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Current analytics per symbol without scanning any history"""
+        with self._lock:
+            names = symbols if symbols is not None else list(self._symbols)
+            return {symbol: self._symbols[symbol].snapshot() for symbol in names if symbol in self._symbols}
+
+    def save(self, path: str = STREAMING_STATE_PATH):
+        """Persist the running state so it survives restarts"""
+        with self._lock:
+            state = {symbol: analytics.to_dict() for symbol, analytics in self._symbols.items()}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str = STREAMING_STATE_PATH):
+        """Restore state saved by save(), if there is any"""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r") as f:
+                state = json.load(f)
+            with self._lock:
+                self._symbols = {symbol: SymbolAnalytics.from_dict(data) for symbol, data in state.items()}
+            logger.info(f"Restored streaming analytics for {len(state)} symbols")
+        except Exception as e:
+            logger.warning(f"Failed to load streaming analytics state: {str(e)}")
+
+# Shared streaming analytics state
+streaming_analytics = StreamingAnalytics()
@@ -0,0 +1,140 @@
+from typing import Dict, Any, Optional
+from dataclasses import dataclass, asdict
+import faiss
+import numpy as np
+import os
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# faiss wants roughly this many training points per centroid / PQ code
+MIN_POINTS_PER_CENTROID = 39
+
+@dataclass
+class IndexConfig:
+    index_type: str = "flat"
+    nlist: int = 1024
+    nprobe: int = 16
+    pq_m: int = 48
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    train_sample: int = 100000
+
+    @classmethod
+    def from_env(cls) -> "IndexConfig":
+        index_type = os.getenv("VECTOR_INDEX_TYPE", "flat").lower()
+        if index_type not in INDEX_TYPES:
+            logger.warning(f"Unknown VECTOR_INDEX_TYPE {index_type}, using flat")
+            index_type = "flat"
+        return cls(
+            index_type=index_type,
+            nlist=int(os.getenv("IVF_NLIST", "1024")),
+            nprobe=int(os.getenv("IVF_NPROBE", "16")),
+            pq_m=int(os.getenv("PQ_M", "48")),
+            pq_nbits=int(os.getenv("PQ_NBITS", "8")),
+            hnsw_m=int(os.getenv("HNSW_M", "32")),
+            ef_construction=int(os.getenv("HNSW_EF_CONSTRUCTION", "200")),
+            ef_search=int(os.getenv("HNSW_EF_SEARCH", "64")),
+            train_sample=int(os.getenv("INDEX_TRAIN_SAMPLE", "100000"))
+        )
+
+    def build_params(self) -> Dict[str, Any]:
+        """Parameters baked into the index at build time, recorded in the manifest"""
+        params = asdict(self)
+        # Search-time knobs can change without a rebuild
+        params.pop("nprobe")
+        params.pop("ef_search")
+        return params
+
+    def min_train_size(self) -> int:
+        if self.index_type == "ivf_flat":
+            return self.nlist * MIN_POINTS_PER_CENTROID
+        if self.index_type == "ivf_pq":
+            return max(self.nlist, 2 ** self.pq_nbits) * MIN_POINTS_PER_CENTROID
+        return 0
+
+def create_index(dimension: int, config: IndexConfig) -> faiss.Index:
+    """Empty (untrained) index of the configured type"""
+    if config.index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, config.hnsw_m)
+        index.hnsw.efConstruction = config.ef_construction
+        index.hnsw.efSearch = config.ef_search
+        return index
+    if config.index_type in ("ivf_flat", "ivf_pq"):
+        quantizer = faiss.IndexFlatL2(dimension)
+        if config.index_type == "ivf_pq":
+            if dimension % config.pq_m:
+                raise ValueError(f"PQ_M={config.pq_m} must divide the embedding dimension {dimension}")
+            index = faiss.IndexIVFPQ(quantizer, dimension, config.nlist, config.pq_m, config.pq_nbits)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, config.nlist)
+        index.nprobe = config.nprobe
+        return index
+    return faiss.IndexFlatL2(dimension)
+
+def train_index(index: faiss.Index, vectors: np.ndarray, config: IndexConfig, seed: int = 0):
+    """Train on a random sample of the corpus rather than all of it"""
+    if index.is_trained:
+        return
+    sample = vectors
+    if len(vectors) > config.train_sample:
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), config.train_sample, replace=False)]
+    index.train(np.ascontiguousarray(sample, dtype='float32'))
+
+def build_index(vectors: np.ndarray, dimension: int, config: IndexConfig) -> faiss.Index:
+    """Build and fill an index, falling back to exact search for corpora too small to train on"""
+    vectors = np.ascontiguousarray(vectors, dtype='float32').reshape(-1, dimension)
+    if len(vectors) < config.min_train_size():
+        logger.info(
+            f"{len(vectors)} vectors are too few to train {config.index_type} "
+            f"(need {config.min_train_size()}), using exact search"
+        )
+        config = IndexConfig(index_type="flat")
+
+    index = create_index(dimension, config)
+    train_index(index, vectors, config)
+    if len(vectors):
+        index.add(vectors)
+    return index
+
+def search_params(
+    index: faiss.Index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    selector: Optional[faiss.IDSelector] = None
+) -> Optional[faiss.SearchParameters]:
+    """Per-query search parameters, leaving the index defaults untouched"""
+    if isinstance(index, faiss.IndexIVF):
+        if nprobe is None and selector is None:
+            return None
+        return faiss.SearchParametersIVF(nprobe=nprobe or index.nprobe, sel=selector)
+    if isinstance(index, faiss.IndexHNSW):
+        if ef_search is None and selector is None:
+            return None
+        return faiss.SearchParametersHNSW(efSearch=ef_search or index.hnsw.efSearch, sel=selector)
+    return faiss.SearchParameters(sel=selector) if selector is not None else None
+
+def apply_search_defaults(index: faiss.Index, config: IndexConfig):
+    """Set the configured nprobe / efSearch on a loaded index"""
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = config.nprobe
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = config.ef_search
+
+def describe_index(index: Optional[faiss.Index]) -> Dict[str, Any]:
+    if index is None:
+        return {"type": None, "ntotal": 0}
+    info = {"type": type(index).__name__, "ntotal": index.ntotal, "dimension": index.d}
+    if isinstance(index, faiss.IndexIVF):
+        info["nlist"] = index.nlist
+        info["nprobe"] = index.nprobe
+    elif isinstance(index, faiss.IndexHNSW):
+        info["ef_search"] = index.hnsw.efSearch
+    return info